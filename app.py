@@ -1,10 +1,13 @@
 """Tkinter window, layout, key bindings, and display loop."""
 
 import os
-import subprocess
+import queue
+import sys
+import threading
+import time
 import tkinter as tk
+from collections import OrderedDict
 from tkinter import messagebox
-from PIL import ImageTk
 
 from constants import (
     MARK_KEEP, MARK_DELETE, MARK_NONE,
@@ -14,47 +17,227 @@ from constants import (
     COLOR_HINT_KEY_BG, COLOR_HINT_KEY_FG,
     COLOR_REVIEW_BG, COLOR_REVIEW_ACCENT,
     COLOR_OVERLAY_KEEP, COLOR_OVERLAY_DELETE, OVERLAY_FLASH_MS,
-    STATUS_BAR_HEIGHT,
+    STATUS_BAR_HEIGHT, COLOR_DUPLICATE, AUTO_MARK_DUPLICATES, TILE_CACHE_SIZE,
+    COMPARE_PANEL_GAP, GRID_CELL, GRID_PHOTO_CACHE, WATCH_UI_POLL_MS,
+    HUD_REFRESH_MS, COLOR_HUD_BG, COLOR_HUD_FG, STARTUP_POLL_MS, WRITE_XMP_SIDECARS,
 )
-from culler_model import CullerModel
-from image_loader import ImageLoader
-from file_mover import execute_sort
+import metrics
 
+# Star ratings are Ctrl+0-5 (Cmd on macOS), leaving plain 1/2/4 for compare
+_RATING_MODIFIER = "Command" if sys.platform == "darwin" else "Control"
+_RATING_KEY_HINT = "\u2318" if sys.platform == "darwin" else "^"
 
-class CullerApp:
-    def __init__(self, folder: str):
-        self.model = CullerModel(folder)
-        if self.model.count == 0:
-            messagebox.showerror("No Images", f"No supported RAW files found in:\n{folder}")
-            return
+# PIL, the model and the loaders are imported where they are first used, so
+# the window can appear before they load (see _load_session).
 
+
+class CullerApp:
+    def __init__(
+        self, folder: str, trace_path: str = None,
+        started: float = None, quit_when_ready: bool = False, catalog: bool = False,
+    ):
+        started = time.perf_counter() if started is None else started
+        self.folder = folder
         self.folder_name = os.path.basename(folder)
-        self.loader = ImageLoader(self.model.images)
+        self._trace_path = trace_path
+        self._started = started  # perf_counter() at process start, for startup metrics
+        self._quit_when_ready = quit_when_ready
+        self._catalog_mode = catalog  # whole tree from a persistent index (catalog.py)
+        self.catalog = None
+        self.model = None  # set once the background scan finishes
+        self.loader = None
         self.index = 0
         self._photo = None  # prevent GC of PhotoImage
         self._rotations = {}  # path -> rotation angle (0, 90, 180, 270)
         self._in_review = False
         self._flash_id = None  # for cancelling pending flash clear
 
+        # 100% zoom state (tile cache is created with the loader)
+        self.tiles = None
+        self._zoomed = False
+        self._zoom_center = (0.5, 0.5)  # zoom point as fractions of image size
+        self._tile_photos = OrderedDict()  # tile key -> PhotoImage
+        self._fit_boxes = []  # (index, x, y, w, h) of each image drawn on the canvas
+        self._drag_from = None  # last pointer position while panning
+        self._last_delta = 1  # direction of the last navigation, for prefetch
+
+        # Multi-up compare state
+        self._panels = 1  # 1, 2 or 4 frames on screen
+        self._compare_start = 0  # index shown in the first panel
+        self._panel_photos = []  # prevent GC of panel PhotoImages
+
+        # Thumbnail grid state (thumbnail loader is created on first use)
+        self.thumbs = None
+        self._grid = False
+        self._grid_scroll = 0  # pixel offset of the top of the grid
+        self._grid_selected = set()  # indices picked for a batch mark
+        self._grid_photos = OrderedDict()  # (path, rotation) -> PhotoImage
+        self._grid_poll_id = None
+
+        self._hud = False  # latency HUD visible
+        self._hud_id = None  # pending HUD refresh
+        self.recorder = None
+        self.watcher = None
+        self.xmp = None  # background XMP sidecar writer
+        self._closed = False
+
+        # Paint the window first; scanning and the first decode happen off the UI thread
         self._build_ui()
+        self._draw_loading()
+        self.root.update()
+        metrics.observe("startup_window_seconds", time.perf_counter() - started)
+
+        self._startup = queue.Queue()  # (kind, payload) from _load_session
+        threading.Thread(target=self._load_session, args=(folder,), daemon=True).start()
+        self.root.after(STARTUP_POLL_MS, self._poll_startup)
+
+        self.root.mainloop()
+
+    def _load_session(self, folder: str):
+        """Scan, decode the first preview, then look for duplicates (background thread)."""
+        try:
+            from culler_model import CullerModel
+            from duplicates import find_duplicates
+            from image_loader import ImageLoader
+
+            if self._catalog_mode:
+                from catalog import Catalog
+                self.catalog = Catalog(folder)
+                self.catalog.rescan()
+            else:
+                # Watch before listing, so files that land during the scan are not missed
+                # (tethering, card copy still running). A catalog rescans on its next open.
+                from folder_watcher import FolderWatcher
+                self.watcher = FolderWatcher(folder)
+                self.watcher.start()
+            model = CullerModel(folder, detect_duplicates=False, catalog=self.catalog)
+            loader = None
+            if model.count:
+                loader = ImageLoader(model.images)
+                loader.get(0)  # also starts preloading the frames after it
+            self._startup.put(("ready", (model, loader)))
+            if model.count:
+                # Hash a copy: the folder watcher may insert into model.images meanwhile.
+                # A catalog already knows every size, so a NAS isn't stat'ed file by file.
+                sizes = self.catalog.sizes() if self.catalog is not None else None
+                self._startup.put(("duplicates", find_duplicates(list(model.images), sizes)))
+        except Exception as e:
+            self._startup.put(("error", e))
+
+    def _poll_startup(self):
+        """Pick up background scan results (Tk must be touched from this thread)."""
+        while True:
+            try:
+                kind, payload = self._startup.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "error":
+                if self.model is not None:
+                    # Duplicate hashing failed after the session opened: keep it and its marks
+                    messagebox.showwarning(
+                        "Duplicate Check Failed", f"Duplicates were not checked:\n{payload}",
+                    )
+                    self._on_duplicates([])  # still report pre-edited files
+                    return  # last message
+                messagebox.showerror("Error", f"Could not open {self.folder}:\n{payload}")
+                self.root.destroy()
+                return
+            if kind == "ready":
+                model, loader = payload
+                if model.count == 0:
+                    messagebox.showerror(
+                        "No Images", f"No supported RAW files found in:\n{self.folder}",
+                    )
+                    self.root.destroy()
+                    return
+                self._start_session(model, loader)
+            elif kind == "duplicates":
+                self._on_duplicates(payload)
+                return  # last message
+        self.root.after(STARTUP_POLL_MS, self._poll_startup)
+
+    def _start_session(self, model, loader):
+        """Show the first image and enable input once the scan is done."""
+        from tile_cache import TileCache
+
+        self.model = model
+        self.loader = loader
+        self.tiles = TileCache(self.loader)
+        if WRITE_XMP_SIDECARS:
+            from xmp_sidecar import XmpWriter
+            self.xmp = XmpWriter()
+            self.model.on_change = self._write_sidecar
         self._bind_keys()
         self._show_current()
+        metrics.observe("startup_first_image_seconds", time.perf_counter() - self._started)
+
+        # Optional navigation trace for headless replay (see session_trace.py)
+        if self._trace_path:
+            from session_trace import TraceRecorder
+            self.recorder = TraceRecorder(self._trace_path, self.folder, self.model.count)
+            # "all" bindings run after the root's, so self.index is already updated
+            self.root.bind_all(
+                "<KeyPress>", lambda e: self.recorder.record(e.keysym, self.index), add="+",
+            )
 
-        # Notify the user about pre-edited files that will be auto-kept
-        if self.model.pre_edited:
-            count = len(self.model.pre_edited)
+        # Insert what arrived since the watcher started (add_files skips listed files),
+        # then keep polling
+        if self.watcher is not None:
+            self._poll_watcher()
+
+        if self._quit_when_ready:
+            self.root.after_idle(self._quit)
+
+    def _on_duplicates(self, groups: list):
+        """Flag duplicates found in the background, then report what the scan found."""
+        self.model.apply_duplicates(groups)
+        if self.model.duplicates:
+            self._show_current()  # marks and the status bar may have changed
+
+        # Notify the user about pre-edited files and duplicates found at scan time
+        notices = self._scan_notices()
+        if notices:
             self.root.after(
                 100,
-                lambda: messagebox.showinfo(
-                    "Pre-edited Files Detected",
-                    f"{count} file{'s' if count != 1 else ''} with XMP sidecars "
-                    f"{'were' if count != 1 else 'was'} found and will be automatically "
-                    f"moved to keep/ when you sort.\n\n"
-                    f"These files are not shown in the culler."
-                )
+                lambda: messagebox.showinfo("Files Detected", "\n\n".join(notices))
             )
 
-        self.root.mainloop()
+    def _write_sidecar(self, path: str):
+        """Queue path's mark and rating for its XMP sidecar; never waits on disk."""
+        self.xmp.write(path, self.model.get_mark(path), self.model.get_rating(path))
+
+    def _draw_loading(self):
+        """Placeholder shown while the folder is scanned and the first preview decoded."""
+        self.canvas.delete("all")
+        cw = max(self.canvas.winfo_width(), 1)
+        ch = max(self.canvas.winfo_height(), 1)
+        self.canvas.create_text(
+            cw // 2, ch // 2, text=f"Loading {self.folder_name}\u2026",
+            fill=COLOR_STATUS_FG, font=("Helvetica", 16),
+        )
+
+    def _scan_notices(self) -> list:
+        """Describe pre-edited and duplicate files found while scanning."""
+        notices = []
+        if self.model.pre_edited:
+            count = len(self.model.pre_edited)
+            notices.append(
+                f"{count} file{'s' if count != 1 else ''} with XMP sidecars "
+                f"{'were' if count != 1 else 'was'} found and will be automatically "
+                f"moved to keep/ when you sort.\n"
+                f"These files are not shown in the culler."
+            )
+        if self.model.duplicates:
+            count = len(self.model.duplicates)
+            action = (
+                "Unmarked copies have been marked for delete."
+                if AUTO_MARK_DUPLICATES else "They are flagged in the status bar."
+            )
+            notices.append(
+                f"{count} exact duplicate{'s' if count != 1 else ''} of other files "
+                f"{'were' if count != 1 else 'was'} found.\n{action}"
+            )
+        return notices
 
     def _build_ui(self):
         self.root = tk.Tk()
@@ -62,6 +245,8 @@ class CullerApp:
         self.root.configure(bg=COLOR_BG)
         self.root.geometry("1280x800")
         self.root.minsize(640, 480)
+        # Closing from the title bar must still flush sidecars, thumbnails and the catalog
+        self.root.protocol("WM_DELETE_WINDOW", self._quit)
 
         # Main canvas for the image
         self.canvas = tk.Canvas(self.root, bg=COLOR_BG, highlightthickness=0)
@@ -140,7 +325,9 @@ class CullerApp:
             hints = [
                 ("K", "keep"), ("X", "del"), ("U", "clear"), ("Z", "undo"),
                 ("R/L", "rotate"), ("\u2190\u2192", "nav"), ("G", "go to"),
-                ("N", "unmarked"), ("P", "preview"), ("\u21b5", "sort"), ("Esc", "quit"),
+                ("N", "unmarked"), (f"{_RATING_KEY_HINT}0-5", "stars"), ("Space", "zoom"),
+                ("1/2/4", "compare"), ("T", "grid"), ("H", "hud"),
+                ("P", "preview"), ("\u21b5", "sort"), ("Esc", "quit"),
             ]
 
         bg = COLOR_REVIEW_BG if review else COLOR_STATUS_BG
@@ -181,11 +368,32 @@ class CullerApp:
         self.root.bind("<Escape>", lambda e: self._escape())
         self.root.bind("<p>", lambda e: self._open_in_preview())
         self.root.bind("<P>", lambda e: self._open_in_preview())
+        self.root.bind("<space>", lambda e: self._toggle_zoom())
+        self.root.bind("<Key-1>", lambda e: self._set_panels(1))
+        self.root.bind("<Key-2>", lambda e: self._set_panels(2))
+        self.root.bind("<Key-4>", lambda e: self._set_panels(4))
+        for stars in range(6):
+            self.root.bind(
+                f"<{_RATING_MODIFIER}-Key-{stars}>", lambda e, n=stars: self._rate(n),
+            )
+        self.root.bind("<h>", lambda e: self._toggle_hud())
+        self.root.bind("<H>", lambda e: self._toggle_hud())
+        self.root.bind("<t>", lambda e: self._toggle_grid())
+        self.root.bind("<T>", lambda e: self._toggle_grid())
+        self.root.bind("<Up>", lambda e: self._grid_step(-1))
+        self.root.bind("<Down>", lambda e: self._grid_step(1))
+        self.canvas.bind("<MouseWheel>", lambda e: self._grid_wheel(-1 if e.delta > 0 else 1))
+        self.canvas.bind("<Button-4>", lambda e: self._grid_wheel(-1))
+        self.canvas.bind("<Button-5>", lambda e: self._grid_wheel(1))
+        self.canvas.bind("<Double-Button-1>", lambda e: self._toggle_zoom(e.x, e.y))
+        self.canvas.bind("<ButtonPress-1>", self._pan_start)
+        self.canvas.bind("<B1-Motion>", self._pan_move)
 
     def _navigate(self, delta: int):
         new_index = self.index + delta
         if 0 <= new_index < self.model.count:
             self.index = new_index
+            self._last_delta = delta
             self._show_current()
 
     def _jump_to(self):
@@ -241,17 +449,40 @@ class CullerApp:
             self._show_current()
 
     def _mark(self, mark):
+        if self._grid and self._grid_selected:
+            # Batch mark everything picked in the grid
+            for i in sorted(self._grid_selected):
+                self.model.set_mark(self.model.images[i], mark)
+            self._grid_selected.clear()
+            self._show_current()
+            return
+
         path = self.model.images[self.index]
         if mark is MARK_NONE:
             self.model.set_mark(path, MARK_NONE)
-            self._update_status()
+            if self._grid or self._panels > 1:
+                self._show_current()  # cell and panel borders show the mark
+            else:
+                self._update_status()
         else:
             self.model.set_mark(path, mark)
             self._flash_overlay(mark)
             # Auto-advance after a brief moment
             if self.index < self.model.count - 1:
                 self.index += 1
+                self._last_delta = 1
+            self._show_current()
+
+    def _rate(self, stars: int):
+        """Set a star rating on the current frame, or on every frame picked in the grid."""
+        if self._grid and self._grid_selected:
+            for i in sorted(self._grid_selected):
+                self.model.set_rating(self.model.images[i], stars)
+            self._grid_selected.clear()
             self._show_current()
+        else:
+            self.model.set_rating(self.model.images[self.index], stars)
+            self._update_status()
 
     def _flash_overlay(self, mark):
         """Show a brief overlay label on the canvas indicating the mark."""
@@ -303,16 +534,361 @@ class CullerApp:
         self._rotations[path] = (current + degrees) % 360
         self._show_current()
 
+    def _toggle_zoom(self, x=None, y=None):
+        """Switch between fit-to-canvas and 100% zoom, optionally at a canvas point."""
+        if self._grid:
+            if x is not None:
+                # Double-clicking a cell opens that frame in the single view
+                self._toggle_grid()
+            return
+        if not self._zoomed and x is not None:
+            for _, bx, by, bw, bh in self._fit_boxes:
+                if bx <= x < bx + bw and by <= y < by + bh:
+                    self._zoom_center = ((x - bx) / bw, (y - by) / bh)
+                    break
+        self._zoomed = not self._zoomed
+        self._show_current()
+
+    def _pan_start(self, event):
+        self._drag_from = (event.x, event.y)
+        if self._grid:
+            self._grid_click(event)
+            return
+        if self._panels > 1:
+            # Clicking a panel makes it the current (markable) frame
+            for index, bx, by, bw, bh in self._fit_boxes:
+                if bx <= event.x < bx + bw and by <= event.y < by + bh:
+                    if index != self.index:
+                        self.index = index
+                        self._show_current()
+                    break
+
+    def _pan_move(self, event):
+        if self._grid or not self._zoomed or self._drag_from is None:
+            return
+        dx = event.x - self._drag_from[0]
+        dy = event.y - self._drag_from[1]
+        self._drag_from = (event.x, event.y)
+        path = self.model.images[self.index]
+        iw, ih = self.tiles.source(self.index, self._rotations.get(path, 0)).size
+        cx, cy = self._zoom_center
+        self._zoom_center = (
+            min(1.0, max(0.0, cx - dx / iw)),
+            min(1.0, max(0.0, cy - dy / ih)),
+        )
+        self._show_current()
+
+    def _show_zoomed(self):
+        """Render the visible 100% tiles and prefetch the next frame's region."""
+        from PIL import ImageTk
+        from tile_cache import zoom_origin
+
+        cw = self.canvas.winfo_width()
+        ch = self.canvas.winfo_height()
+        if cw < 2 or ch < 2:
+            return
+
+        path = self.model.images[self.index]
+        rotation = self._rotations.get(path, 0)
+        src = self.tiles.source(self.index, rotation)
+
+        # Re-clamp the zoom point so panning never drifts past the image edge
+        ox, oy = zoom_origin(src.size, self._zoom_center, (cw, ch))
+        cx, cy = self._zoom_center
+        if src.width > cw:
+            cx = (ox + cw // 2) / src.width
+        if src.height > ch:
+            cy = (oy + ch // 2) / src.height
+        self._zoom_center = (cx, cy)
+
+        self.canvas.delete("all")
+        for key, x, y, tile in self.tiles.visible(self.index, rotation, self._zoom_center, (cw, ch)):
+            photo = self._tile_photos.get(key)
+            if photo is None:
+                photo = ImageTk.PhotoImage(tile)
+                self._tile_photos[key] = photo
+                while len(self._tile_photos) > TILE_CACHE_SIZE:
+                    self._tile_photos.popitem(last=False)
+            else:
+                self._tile_photos.move_to_end(key)
+            self.canvas.create_image(x, y, image=photo, anchor=tk.NW)
+
+        next_index = self._upcoming_index()
+        if next_index is not None:
+            next_rotation = self._rotations.get(self.model.images[next_index], 0)
+            self.tiles.prefetch(next_index, next_rotation, self._zoom_center, (cw, ch))
+
+        self._update_status()
+
+    def _toggle_grid(self):
+        """Switch between the thumbnail grid and the image view."""
+        if self.thumbs is None:
+            from thumbnails import ThumbnailLoader, ThumbnailStore
+            try:
+                store = ThumbnailStore()
+            except Exception:
+                store = None  # grid still works, thumbnails just aren't persisted
+            self.thumbs = ThumbnailLoader(self.model.images, store)
+        self._grid = not self._grid
+        self._grid_selected.clear()
+        self._show_current()
+
+    def _grid_layout(self):
+        """Return (columns, left padding) for the current canvas width."""
+        cw = self.canvas.winfo_width()
+        cols = max(1, cw // GRID_CELL[0])
+        return cols, (cw - cols * GRID_CELL[0]) // 2
+
+    def _grid_step(self, rows: int):
+        if self._grid:
+            self._navigate(rows * self._grid_layout()[0])
+
+    def _grid_wheel(self, direction: int):
+        if self._grid:
+            self._grid_scroll += direction * GRID_CELL[1] // 3
+            self._draw_grid()
+
+    def _grid_click(self, event):
+        """Select a cell; Shift extends a range, Ctrl/Cmd toggles a cell in the selection."""
+        cols, x_pad = self._grid_layout()
+        col = (event.x - x_pad) // GRID_CELL[0]
+        index = ((event.y + self._grid_scroll) // GRID_CELL[1]) * cols + col
+        if not (0 <= col < cols and 0 <= index < self.model.count):
+            return
+        if event.state & 0x0001:  # Shift
+            lo, hi = sorted((self.index, index))
+            self._grid_selected.update(range(lo, hi + 1))
+        elif event.state & (0x0004 | 0x0008):  # Control / Command
+            if not self._grid_selected:
+                self._grid_selected.add(self.index)
+            self._grid_selected ^= {index}
+        else:
+            self._grid_selected.clear()
+        self.index = index
+        self._draw_grid()
+
+    def _show_grid(self):
+        """Scroll the current frame into view and draw the grid."""
+        ch = self.canvas.winfo_height()
+        cols, _ = self._grid_layout()
+        top = (self.index // cols) * GRID_CELL[1]
+        if top < self._grid_scroll:
+            self._grid_scroll = top
+        elif top + GRID_CELL[1] > self._grid_scroll + ch:
+            self._grid_scroll = top + GRID_CELL[1] - ch
+        self._draw_grid()
+
+    def _draw_grid(self):
+        """Draw only the visible cells; missing thumbnails are requested in the background."""
+        cw = self.canvas.winfo_width()
+        ch = self.canvas.winfo_height()
+        if cw < 2 or ch < 2:
+            return
+
+        cell_w, cell_h = GRID_CELL
+        cols, x_pad = self._grid_layout()
+        total_rows = -(-self.model.count // cols)
+        self._grid_scroll = max(0, min(self._grid_scroll, total_rows * cell_h - ch))
+
+        first_row = self._grid_scroll // cell_h
+        last_row = (self._grid_scroll + ch - 1) // cell_h
+        visible = range(first_row * cols, min(self.model.count, (last_row + 1) * cols))
+        # Load one screen of margin either side so scrolling rarely shows gaps
+        margin = (last_row - first_row + 1) * cols
+        self.thumbs.request(range(
+            max(0, visible.start - margin), min(self.model.count, visible.stop + margin),
+        ))
+
+        self.canvas.delete("all")
+        for i in visible:
+            row, col = divmod(i, cols)
+            x = x_pad + col * cell_w
+            y = row * cell_h - self._grid_scroll
+            path = self.model.images[i]
+            mark = self.model.get_mark(path)
+            color = {MARK_KEEP: COLOR_KEEP, MARK_DELETE: COLOR_DELETE}.get(mark, COLOR_UNMARKED)
+
+            if i in self._grid_selected:
+                self.canvas.create_rectangle(
+                    x + 2, y + 2, x + cell_w - 2, y + cell_h - 2,
+                    fill=COLOR_REVIEW_BG, outline=COLOR_REVIEW_ACCENT, width=2,
+                )
+            self.canvas.create_rectangle(
+                x + 6, y + 6, x + cell_w - 6, y + cell_h - 22,
+                outline=COLOR_POSITION if i == self.index else color,
+                width=3 if i == self.index else 1,
+            )
+
+            photo = self._grid_photo(i, path)
+            if photo is not None:
+                self.canvas.create_image(
+                    x + cell_w // 2, y + 6 + (cell_h - 28) // 2, image=photo, anchor=tk.CENTER,
+                )
+            self.canvas.create_text(
+                x + cell_w // 2, y + cell_h - 12, text=os.path.basename(path),
+                fill=color if mark else COLOR_STATUS_FG, font=("Helvetica", 10),
+            )
+
+        if self.thumbs.pending and self._grid_poll_id is None:
+            self._grid_poll_id = self.root.after(16, self._grid_poll)
+        self._update_status()
+
+    def _grid_photo(self, index: int, path: str):
+        """PhotoImage for a cell, or None while its thumbnail is still loading."""
+        from PIL import ImageTk
+
+        rotation = self._rotations.get(path, 0)
+        key = (path, rotation)
+        photo = self._grid_photos.get(key)
+        if photo is not None:
+            self._grid_photos.move_to_end(key)
+            return photo
+        img = self.thumbs.get(index)
+        if img is None:
+            return None
+        if rotation:
+            img = img.rotate(-rotation, expand=True)  # negative because PIL rotates CCW
+        photo = ImageTk.PhotoImage(img)
+        self._grid_photos[key] = photo
+        while len(self._grid_photos) > GRID_PHOTO_CACHE:
+            self._grid_photos.popitem(last=False)
+        return photo
+
+    def _grid_poll(self):
+        """Redraw once background thumbnails arrive (Tk must be touched from this thread)."""
+        self._grid_poll_id = None
+        if not self._grid:
+            return
+        if self.thumbs.drain():
+            self._draw_grid()
+        elif self.thumbs.pending:
+            self._grid_poll_id = self.root.after(16, self._grid_poll)
+
+    def _poll_watcher(self):
+        """Insert newly arrived files, keeping the current frame and marks in place."""
+        inserted = self.model.add_files(self.watcher.drain())
+        if inserted:
+            self._on_files_inserted(inserted)
+        self.root.after(WATCH_UI_POLL_MS, self._poll_watcher)
+
+    def _on_files_inserted(self, inserted: list):
+        """Shift index-based state past the inserted positions (ascending final indices)."""
+        def shift(i):
+            for pos in inserted:
+                if pos <= i:
+                    i += 1
+            return i
+
+        self.index = shift(self.index)
+        self._compare_start = shift(self._compare_start)
+        self._grid_selected = {shift(i) for i in self._grid_selected}
+        if self._in_review:
+            self._delete_review_list = [shift(i) for i in self._delete_review_list]
+        self.loader.refresh(self.index)
+        if self._grid or self._panels > 1:
+            self._show_current()  # neighbours on screen changed
+        else:
+            self._update_status()
+
+    def _upcoming_index(self):
+        """Index the next navigation in the current direction will show, or None."""
+        if self._in_review:
+            pos = self._review_pos + self._last_delta
+            if 0 <= pos < len(self._delete_review_list):
+                return self._delete_review_list[pos]
+            return None
+        next_index = self.index + self._last_delta
+        return next_index if 0 <= next_index < self.model.count else None
+
+    def _set_panels(self, panels: int):
+        """Switch between single view and 2-up / 4-up compare."""
+        if panels != self._panels:
+            self._panels = panels
+            self._show_current()
+
+    def _compare_indices(self) -> list:
+        """Indices shown in compare panels: a window of neighbours holding the current frame."""
+        n = min(self._panels, self.model.count)
+        start = self._compare_start
+        if self.index < start:
+            start = self.index
+        elif self.index >= start + n:
+            start = self.index - n + 1
+        start = max(0, min(start, self.model.count - n))
+        self._compare_start = start
+        return list(range(start, start + n))
+
+    def _show_compare(self):
+        """Render 2-up / 4-up panels, decoding and scaling them in parallel."""
+        from PIL import ImageTk
+
+        cw = self.canvas.winfo_width()
+        ch = self.canvas.winfo_height()
+        if cw < 2 or ch < 2:
+            return
+
+        cols, rows = (2, 1) if self._panels == 2 else (2, 2)
+        gap = COMPARE_PANEL_GAP
+        pw = max(1, (cw - gap * (cols + 1)) // cols)
+        ph = max(1, (ch - gap * (rows + 1)) // rows)
+        indices = self._compare_indices()
+        rotations = [self._rotations.get(self.model.images[i], 0) for i in indices]
+
+        if self._zoomed:
+            images = self.tiles.regions(list(zip(indices, rotations)), self._zoom_center, (pw, ph))
+            self.loader.get(self.index)  # already decoded; keeps preloading around current
+        else:
+            images = self.loader.renditions(
+                [(i, rot, (pw, ph)) for i, rot in zip(indices, rotations)], center=self.index,
+            )
+
+        self.canvas.delete("all")
+        self._panel_photos = []
+        self._fit_boxes = []
+        for slot, (index, img) in enumerate(zip(indices, images)):
+            px = gap + (slot % cols) * (pw + gap)
+            py = gap + (slot // cols) * (ph + gap)
+            photo = ImageTk.PhotoImage(img)
+            self._panel_photos.append(photo)
+            x = px + (pw - img.width) // 2
+            y = py + (ph - img.height) // 2
+            self.canvas.create_image(x, y, image=photo, anchor=tk.NW)
+            self._fit_boxes.append((index, x, y, img.width, img.height))
+
+            mark = self.model.get_mark(self.model.images[index])
+            color = {MARK_KEEP: COLOR_KEEP, MARK_DELETE: COLOR_DELETE}.get(mark, COLOR_UNMARKED)
+            if index == self.index:
+                self.canvas.create_rectangle(
+                    px - 2, py - 2, px + pw + 1, py + ph + 1, outline=COLOR_POSITION, width=3,
+                )
+            self.canvas.create_rectangle(px, py, px + pw - 1, py + ph - 1, outline=color, width=2)
+
+        self._update_status()
+
+    @metrics.timed("show_current_seconds")
     def _show_current(self):
+        if self.model is None:
+            self._draw_loading()
+            return
         if self.model.count == 0:
             return
+        if self._grid:
+            self._show_grid()
+            return
+        if self._panels > 1:
+            self._show_compare()
+            return
+        if self._zoomed:
+            self._show_zoomed()
+            return
         img = self.loader.get(self.index)
 
         # Apply rotation if any
         path = self.model.images[self.index]
         rotation = self._rotations.get(path, 0)
         if rotation:
-            img = img.rotate(-rotation, expand=True)  # negative because PIL rotates CCW
+            with metrics.timer("show_rotate_seconds"):
+                img = img.rotate(-rotation, expand=True)  # negative because PIL rotates CCW
 
         # Fit image to canvas
         cw = self.canvas.winfo_width()
@@ -324,17 +900,55 @@ class CullerApp:
         scale = min(cw / iw, ch / ih)
         new_w = max(1, int(iw * scale))
         new_h = max(1, int(ih * scale))
-        resized = img.resize((new_w, new_h), resample=1)  # BILINEAR
+        with metrics.timer("show_resize_seconds"):
+            resized = img.resize((new_w, new_h), resample=1)  # BILINEAR
 
-        self._photo = ImageTk.PhotoImage(resized)
+        from PIL import ImageTk
+        with metrics.timer("show_photoimage_seconds"):
+            self._photo = ImageTk.PhotoImage(resized)
+        self._fit_boxes = [(self.index, (cw - new_w) // 2, (ch - new_h) // 2, new_w, new_h)]
         self.canvas.delete("all")
         self.canvas.create_image(cw // 2, ch // 2, image=self._photo, anchor=tk.CENTER)
 
         self._update_status()
 
+    def _toggle_hud(self):
+        self._hud = not self._hud
+        if self._hud:
+            self._refresh_hud()
+        else:
+            if self._hud_id:
+                self.root.after_cancel(self._hud_id)
+                self._hud_id = None
+            self.canvas.delete("hud")
+
+    def _refresh_hud(self):
+        """Redraw the HUD periodically so background work (preloads) shows up too."""
+        self._draw_hud()
+        self._hud_id = self.root.after(HUD_REFRESH_MS, self._refresh_hud)
+
+    def _draw_hud(self):
+        """Draw current latency metrics in the top-left corner of the canvas."""
+        self.canvas.delete("hud")
+        lines = metrics.hud_lines() or ["no metrics recorded yet"]
+        text_id = self.canvas.create_text(
+            12, 12, text="\n".join(lines), anchor=tk.NW, fill=COLOR_HUD_FG,
+            font=("Menlo", 10), tags="hud",
+        )
+        bbox = self.canvas.bbox(text_id)
+        if bbox:
+            bg = self.canvas.create_rectangle(
+                bbox[0] - 6, bbox[1] - 6, bbox[2] + 6, bbox[3] + 6,
+                fill=COLOR_HUD_BG, outline="", stipple="gray75", tags="hud",
+            )
+            self.canvas.tag_lower(bg, text_id)
+
     def _update_status(self):
         path = self.model.images[self.index]
-        filename = os.path.basename(path)
+        if self.catalog is not None:
+            filename = os.path.relpath(path, self.model.folder)  # show which subfolder
+        else:
+            filename = os.path.basename(path)
         mark = self.model.get_mark(path)
         summary = self.model.summary()
 
@@ -346,20 +960,29 @@ class CullerApp:
             pos_text = f"{self.index + 1}/{self.model.count}"
             self.lbl_position.config(text=pos_text, fg=COLOR_POSITION)
 
-        self.lbl_filename.config(text=filename)
+        original = self.model.duplicates.get(path)
+        if original:
+            self.lbl_filename.config(
+                text=f"{filename}  \u2022  duplicate of {os.path.basename(original)}",
+                fg=COLOR_DUPLICATE,
+            )
+        else:
+            self.lbl_filename.config(text=filename, fg=COLOR_FILENAME)
 
-        # Mark pill badge
+        # Mark pill badge, with stars once rated this session
+        rating = self.model.get_rating(path)
+        stars = " " + "\u2605" * rating + " " if rating else ""
         if mark == MARK_KEEP:
             self.mark_pill.config(
-                text=" KEEP ", fg=COLOR_KEEP, bg=COLOR_KEEP_PILL_BG,
+                text=f" KEEP {stars}", fg=COLOR_KEEP, bg=COLOR_KEEP_PILL_BG,
             )
         elif mark == MARK_DELETE:
             self.mark_pill.config(
-                text=" DELETE ", fg=COLOR_DELETE, bg=COLOR_DELETE_PILL_BG,
+                text=f" DELETE {stars}", fg=COLOR_DELETE, bg=COLOR_DELETE_PILL_BG,
             )
         else:
             self.mark_pill.config(
-                text=" UNMARKED ", fg=COLOR_UNMARKED, bg=COLOR_UNMARKED_PILL_BG,
+                text=f" UNMARKED {stars}", fg=COLOR_UNMARKED, bg=COLOR_UNMARKED_PILL_BG,
             )
 
         # Summary with colored counts
@@ -369,10 +992,20 @@ class CullerApp:
 
         # Window title
         mode = " [REVIEW]" if self._in_review else ""
+        if self._grid:
+            selected = f", {len(self._grid_selected)} selected" if self._grid_selected else ""
+            mode += f" [GRID{selected}]"
+        elif self._panels > 1:
+            mode += f" [{self._panels}-UP]"
+        if self._zoomed:
+            mode += " [100%]"
         self.root.title(
             f"RAW Culler \u2014 {self.folder_name} ({pos_text}){mode}"
         )
 
+        if self._hud:
+            self._draw_hud()  # the canvas was just cleared and redrawn
+
     def _set_review_theme(self, active: bool):
         """Switch status bar between normal and review mode styling."""
         bg = COLOR_REVIEW_BG if active else COLOR_STATUS_BG
@@ -418,6 +1051,7 @@ class CullerApp:
         if 0 <= new_pos < len(self._delete_review_list):
             self._review_pos = new_pos
             self.index = self._delete_review_list[self._review_pos]
+            self._last_delta = delta
             self._show_current()
 
     def _exit_review(self):
@@ -434,7 +1068,7 @@ class CullerApp:
     def _finish_sort(self):
         """Actually execute the sort after review."""
         self._exit_review()
-        result = execute_sort(self.model.folder, self.model.marks, self.model.pre_edited)
+        result = self._run_sort()
 
         total = result["moved"] + result["pre_edited_moved"]
         if result["errors"]:
@@ -448,6 +1082,17 @@ class CullerApp:
 
         self._quit()
 
+    def _run_sort(self) -> dict:
+        """Move marked files; in catalog mode, into each subfolder's own keep/ and delete/."""
+        from file_mover import execute_sort, execute_sort_tree
+        if self.xmp is not None:
+            self.xmp.flush()  # sidecars must exist so they move with their RAWs
+        if self.catalog is not None:
+            result = execute_sort_tree(self.model.marks, self.model.pre_edited)
+            self.catalog.moved(result["renamed"])  # keep marks and ratings of moved files
+            return result
+        return execute_sort(self.model.folder, self.model.marks, self.model.pre_edited)
+
     def _execute_sort(self):
         summary = self.model.summary()
         if summary["keep"] == 0 and summary["delete"] == 0:
@@ -529,7 +1174,7 @@ class CullerApp:
                     self._start_review_deletes()
                     return
 
-        result = execute_sort(self.model.folder, self.model.marks, self.model.pre_edited)
+        result = self._run_sort()
 
         total = result["moved"] + result["pre_edited_moved"]
         if result["errors"]:
@@ -544,6 +1189,7 @@ class CullerApp:
         self._quit()
 
     def _open_in_preview(self):
+        import subprocess
         path = self.model.images[self.index]
         subprocess.Popen(["open", "-a", "Preview", path])
 
@@ -555,5 +1201,25 @@ class CullerApp:
             self._quit()
 
     def _quit(self):
-        self.loader.shutdown()
+        """Shut everything down; safe to call twice and before the session is ready."""
+        if self._closed:
+            return
+        self._closed = True
+        if self.recorder:
+            self.recorder.close()
+        if self.watcher is not None:
+            self.watcher.stop()
+        if self.xmp is not None:
+            self.xmp.close()
+            for error in self.xmp.errors[:20]:
+                print(f"XMP sidecar not written: {error}")
+        if self.catalog is not None and self.model is not None:
+            # Before the session is ready the loader thread may still be rescanning it
+            self.catalog.close()
+        if self.thumbs is not None:
+            self.thumbs.shutdown()
+        if self.tiles is not None:
+            self.tiles.shutdown()
+        if self.loader is not None:
+            self.loader.shutdown()
         self.root.destroy()
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""Headless benchmark suite for RAW Image Culler.
+
+Generates synthetic TIFF-structured RAW fixtures (IFD0 full-size JPEG
+preview, IFD1 thumbnail, a few XMP sidecars), then measures folder scan
+time, time to first image, ImageLoader.get hit/miss latency under
+scripted navigation, peak RSS, catalog index and reopen time, XMP
+sidecar write throughput, and execute_sort throughput. Each fixture
+size runs in its own process so caches and peak RSS don't leak between
+sizes. No Tk window is opened, so it runs on a headless Linux box; when a
+display is available, cold start of the real app is timed as well.
+
+Usage:
+    python benchmark.py                                # 1,000 / 10,000 / 100,000 files
+    python benchmark.py --sizes 1000 --out bench.json
+    python benchmark.py --sizes 1000 --baseline old.json --check
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from constants import MARK_KEEP, MARK_DELETE, MARK_NONE
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+FIXTURE_EXTENSIONS = [".cr2", ".nef", ".arw", ".dng"]
+PREVIEW_SIZE = (1620, 1080)
+THUMBNAIL_SIZE = (160, 107)
+
+# Latency targets: metric -> (limit, "max" or "min")
+TARGETS = {
+    "startup_imports_s": (0.2, "max"),
+    "startup_window_s": (0.2, "max"),
+    "first_image_s": (0.5, "max"),
+    "scan_per_1k_s": (0.05, "max"),
+    "get_hit_p99_ms": (5.0, "max"),
+    "get_miss_p99_ms": (150.0, "max"),
+    "catalog_open_s": (1.0, "max"),
+    "xmp_files_per_s": (1000.0, "min"),
+    "sort_files_per_s": (1000.0, "min"),
+}
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+def _jpeg(size, seed: int) -> bytes:
+    from PIL import Image, ImageDraw
+    rng = random.Random(seed)
+    img = Image.new("RGB", size, tuple(rng.randrange(40, 120) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        draw.rectangle(
+            (x, y, x + size[0] // 6, y + size[1] // 6),
+            fill=tuple(rng.randrange(256) for _ in range(3)),
+        )
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=80)
+    return buf.getvalue()
+
+
+def _tiff_raw(serial: bytes, preview: bytes, thumb: bytes, padding: int) -> bytes:
+    """
+    Little-endian TIFF: IFD0 holds a JPEG-compressed strip (the full-size
+    preview), IFD1 the JPEGInterchangeFormat thumbnail.
+    """
+    ifd0 = 8
+    ifd0_len = 2 + 4 * 12 + 4
+    ifd1 = ifd0 + ifd0_len
+    ifd1_len = 2 + 2 * 12 + 4
+    serial_off = ifd1 + ifd1_len
+    thumb_off = serial_off + len(serial)
+    preview_off = thumb_off + len(thumb)
+
+    out = io.BytesIO()
+    out.write(b"II*\x00" + struct.pack("<I", ifd0))
+    out.write(struct.pack("<H", 4))
+    out.write(struct.pack("<HHIHH", 0x103, 3, 1, 6, 0))           # Compression = JPEG
+    out.write(struct.pack("<HHII", 0x111, 4, 1, preview_off))     # StripOffsets
+    out.write(struct.pack("<HHIHH", 0x112, 3, 1, 1, 0))           # Orientation
+    out.write(struct.pack("<HHII", 0x117, 4, 1, len(preview)))    # StripByteCounts
+    out.write(struct.pack("<I", ifd1))
+    out.write(struct.pack("<H", 2))
+    out.write(struct.pack("<HHII", 0x201, 4, 1, thumb_off))
+    out.write(struct.pack("<HHII", 0x202, 4, 1, len(thumb)))
+    out.write(struct.pack("<I", 0))
+    out.write(serial)
+    out.write(thumb)
+    out.write(preview)
+    out.write(b"\0" * padding)  # stands in for sensor data
+    return out.getvalue()
+
+
+_XMP = """<?xpacket begin="" id="W5M0MpCehiHzreSzNTczkc9d"?>
+<x:xmpmeta xmlns:x="adobe:ns:meta/">
+ <rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">
+  <rdf:Description rdf:about="" xmlns:xmp="http://ns.adobe.com/xap/1.0/" xmp:Rating="3"/>
+ </rdf:RDF>
+</x:xmpmeta>
+<?xpacket end="w"?>
+"""
+
+
+def make_fixtures(folder: str, count: int, seed: int = 0, xmp_ratio: float = 0.02,
+                  raw_mb: int = 0):
+    """
+    Write count synthetic RAW files (plus XMP sidecars for xmp_ratio of
+    them) into folder. Every file has a unique serial in its header and a
+    varying amount of padding, so no two are byte-identical. raw_mb extends
+    each file sparsely to a realistic size without using disk space.
+    """
+    os.makedirs(folder, exist_ok=True)
+    rng = random.Random(seed)
+    previews = [_jpeg(PREVIEW_SIZE, seed + i) for i in range(4)]
+    thumbs = [_jpeg(THUMBNAIL_SIZE, seed + i) for i in range(4)]
+    for i in range(count):
+        ext = FIXTURE_EXTENSIONS[i % len(FIXTURE_EXTENSIONS)]
+        path = os.path.join(folder, f"IMG_{i:06d}{ext}")
+        data = _tiff_raw(
+            rng.randbytes(16), previews[i % 4], thumbs[i % 4], rng.randrange(4096),
+        )
+        with open(path, "wb") as f:
+            f.write(data)
+            if raw_mb:
+                f.truncate(len(data) + raw_mb * 1024 * 1024)
+        if rng.random() < xmp_ratio:
+            with open(os.path.splitext(path)[0] + ".xmp", "w") as f:
+                f.write(_XMP)
+
+
+# ---------------------------------------------------------------------------
+# Measurements (run in a child process per fixture size)
+# ---------------------------------------------------------------------------
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def navigation_script(steps: int, seed: int = 0) -> List[tuple]:
+    """
+    Deterministic (delta, dwell_s) steps resembling a culling session:
+    mostly forward, some bursts, occasional step back, rare jumps.
+    """
+    rng = random.Random(seed)
+    script = []
+    for _ in range(steps):
+        roll = rng.random()
+        if roll < 0.75:
+            script.append((1, rng.uniform(0.08, 0.25)))      # look, then next
+        elif roll < 0.90:
+            script.append((1, rng.uniform(0.01, 0.04)))      # flying through a burst
+        elif roll < 0.97:
+            script.append((-1, rng.uniform(0.05, 0.15)))     # second look
+        else:
+            script.append((rng.randint(-40, 40) or 1, 0.2))  # jump (G)
+    return script
+
+
+def run_one(folder: str, steps: int, seed: int) -> Dict:
+    from culler_model import CullerModel
+    from image_loader import ImageLoader
+    from file_mover import execute_sort
+
+    result: Dict = {}
+
+    # Same order as the app: first image before duplicate hashing
+    t0 = time.perf_counter()
+    model = CullerModel(folder, detect_duplicates=False)
+    result["model_init_s"] = time.perf_counter() - t0
+    loader = ImageLoader(model.images)
+    loader.get(0)
+    result["first_image_s"] = time.perf_counter() - t0
+    result["images"] = model.count
+    result["pre_edited"] = len(model.pre_edited)
+
+    # Warm re-run of the scan alone; duplicate hashing then runs as it does in
+    # the app, after the first image
+    t = time.perf_counter()
+    model._scan_folder()
+    result["scan_folder_s"] = time.perf_counter() - t
+    result["scan_per_1k_s"] = result["scan_folder_s"] / max(1, model.count) * 1000
+    t = time.perf_counter()
+    model._detect_duplicates()
+    result["detect_duplicates_s"] = time.perf_counter() - t
+
+    hits: List[float] = []
+    misses: List[float] = []
+    index = 0
+    for delta, dwell in navigation_script(steps, seed):
+        index = max(0, min(model.count - 1, index + delta))
+        cached = loader.is_cached(index)
+        t = time.perf_counter()
+        loader.get(index)
+        elapsed_ms = (time.perf_counter() - t) * 1000
+        (hits if cached else misses).append(elapsed_ms)
+        time.sleep(dwell)
+    loader.shutdown()
+    for name, values in (("hit", hits), ("miss", misses)):
+        result[f"get_{name}_count"] = len(values)
+        result[f"get_{name}_p50_ms"] = _percentile(values, 50)
+        result[f"get_{name}_p99_ms"] = _percentile(values, 99)
+
+    # Catalog mode: first index of the tree, then a reopen (incremental rescan + load)
+    from catalog import Catalog
+    fd, db_path = tempfile.mkstemp(prefix="raw_culler_catalog_", suffix=".sqlite")
+    os.close(fd)
+    try:
+        t = time.perf_counter()
+        catalog = Catalog(folder, db_path)
+        catalog.rescan()
+        catalog.close()
+        result["catalog_index_s"] = time.perf_counter() - t
+        t = time.perf_counter()
+        catalog = Catalog(folder, db_path)
+        rescan = catalog.rescan()
+        reopened = CullerModel(folder, detect_duplicates=False, catalog=catalog)
+        result["catalog_open_s"] = time.perf_counter() - t
+        result["catalog_dirs_listed"] = rescan["dirs_listed"]
+        result["catalog_images"] = reopened.count
+        catalog.close()
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.unlink(db_path + suffix)
+
+    # Every mark written as a sidecar through the background writer, then moved by the sort
+    from xmp_sidecar import XmpWriter
+    writer = XmpWriter()
+    t = time.perf_counter()
+    for i, path in enumerate(model.images):
+        model.marks[path] = (MARK_KEEP, MARK_DELETE, MARK_NONE)[i % 3]
+        writer.write(path, model.marks[path])
+    # Time the writer draining on its own, as in a session; close() would skip its waits
+    while not writer.idle:
+        time.sleep(0.005)
+    elapsed = time.perf_counter() - t
+    writer.close()
+    result["xmp_write_s"] = elapsed
+    result["xmp_files_per_s"] = writer.written / elapsed if elapsed else None
+    result["xmp_errors"] = len(writer.errors)
+
+    t = time.perf_counter()
+    sort_result = execute_sort(model.folder, model.marks, model.pre_edited)
+    elapsed = time.perf_counter() - t
+    moved = sort_result["moved"] + sort_result["pre_edited_moved"]
+    result["sort_s"] = elapsed
+    result["sort_files_moved"] = moved
+    result["sort_sidecars_moved"] = sort_result["sidecars_moved"]
+    result["sort_files_per_s"] = moved / elapsed if elapsed else None
+    result["sort_errors"] = len(sort_result["errors"])
+
+    import metrics
+    result["metrics"] = metrics.snapshot()
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result["peak_rss_mb"] = rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return result
+
+
+def measure_startup(folder: str) -> Dict:
+    """
+    Cold-start timings of main.py in fresh interpreters. startup_imports_s is
+    interpreter start plus everything main.py imports before the window
+    exists. With a display, main.py is also run with --quit-when-ready and
+    its own window / first-image timings are read back from its metrics.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    result: Dict = {}
+    t = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import main, app"], check=True, cwd=here)
+    result["startup_imports_s"] = time.perf_counter() - t
+
+    if sys.platform != "darwin" and not os.environ.get("DISPLAY"):
+        return result
+    fd, out = tempfile.mkstemp(prefix="raw_culler_startup_", suffix=".json")
+    os.close(fd)
+    try:
+        t = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "main.py", folder, "--quit-when-ready", "--metrics-out", out],
+            check=True, capture_output=True, timeout=300, cwd=here,
+        )
+        result["startup_process_s"] = time.perf_counter() - t
+        with open(out) as f:
+            histograms = json.load(f)["histograms"]
+        result["startup_window_s"] = histograms["startup_window_seconds"]["last"]
+        result["startup_first_image_s"] = histograms["startup_first_image_seconds"]["last"]
+    finally:
+        os.unlink(out)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def check_targets(result: Dict) -> Dict:
+    checks = {}
+    for metric, (limit, kind) in TARGETS.items():
+        value = result.get(metric)
+        ok = value is None or (value <= limit if kind == "max" else value >= limit)
+        checks[metric] = {"value": value, "target": limit, "kind": kind, "ok": ok}
+    return checks
+
+
+def compare(current: Dict, baseline: Dict):
+    """Print per-metric change against an earlier run's JSON."""
+    base_runs = {str(r["files"]): r for r in baseline.get("runs", [])}
+    for run in current["runs"]:
+        base = base_runs.get(str(run["files"]))
+        if base is None:
+            continue
+        print(f"\n{run['files']} files vs baseline:")
+        for key, value in run.items():
+            old = base.get(key)
+            if isinstance(value, (int, float)) and isinstance(old, (int, float)) and old:
+                print(f"  {key:24s} {old:12.4f} -> {value:12.4f}  ({(value - old) / old:+.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--steps", type=int, default=200, help="navigation steps per size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--raw-mb", type=int, default=0, help="sparse padding per file")
+    parser.add_argument("--workdir", help="fixture directory (default: a temp dir)")
+    parser.add_argument("--keep-fixtures", action="store_true")
+    parser.add_argument("--out", help="write JSON results here (default: stdout)")
+    parser.add_argument("--baseline", help="earlier JSON output to compare against")
+    parser.add_argument("--check", action="store_true", help="exit 1 if a target is missed")
+    parser.add_argument("--run-one", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        json.dump(run_one(args.run_one, args.steps, args.seed), sys.stdout)
+        return
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="raw_culler_bench_")
+    runs = []
+    try:
+        for size in args.sizes:
+            folder = os.path.join(workdir, f"fixtures_{size}")
+            shutil.rmtree(folder, ignore_errors=True)
+            t = time.perf_counter()
+            make_fixtures(folder, size, seed=args.seed, raw_mb=args.raw_mb)
+            print(f"{size} fixtures in {time.perf_counter() - t:.1f}s", file=sys.stderr)
+
+            startup = measure_startup(folder)  # before run_one sorts the fixtures
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--run-one", folder,
+                 "--steps", str(args.steps), "--seed", str(args.seed)],
+                capture_output=True, text=True, check=True,
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+            )
+            run = {"files": size, **startup, **json.loads(proc.stdout)}
+            run["targets"] = check_targets(run)
+            runs.append(run)
+            print(f"{size} files: imports {run['startup_imports_s']:.3f}s, "
+                  f"first image {run['first_image_s']:.3f}s, "
+                  f"scan {run['scan_folder_s']:.3f}s, "
+                  f"peak RSS {run['peak_rss_mb']:.0f} MB", file=sys.stderr)
+            if not args.keep_fixtures:
+                shutil.rmtree(folder, ignore_errors=True)
+    finally:
+        if not args.keep_fixtures and not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": runs,
+    }
+    text = json.dumps(output, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(output, json.load(f))
+
+    failed = [
+        f"{run['files']}:{metric}" for run in runs
+        for metric, check in run["targets"].items() if not check["ok"]
+    ]
+    if failed:
+        print("Missed targets: " + ", ".join(failed), file=sys.stderr)
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""Persistent SQLite index of a whole job tree, for catalog mode.
+
+A job is a directory tree of dated subfolders, each with its own keep/ and
+delete/. The catalog records every RAW in the tree with its size, mtime,
+XMP sidecar pairing and the mark implied by its location, plus marks and
+ratings set in the culler, so they survive between sessions and across
+folders without a sort.
+
+Rescans are incremental. Every known directory is stat'ed once, and only
+directories whose mtime changed are listed and have their files stat'ed.
+Adding, removing or renaming entries changes a directory's mtime, and new
+subfolders show up when their parent is listed. Files rewritten in place
+are not noticed, which is fine for RAWs.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from constants import (
+    SUPPORTED_EXTENSIONS, MARK_KEEP, MARK_DELETE, MARK_NONE, KEEP_FOLDER, DELETE_FOLDER,
+    CATALOG_DIR,
+)
+from xmp_sidecar import is_culler_sidecar, match_sidecar
+
+_SCHEMA_VERSION = 1
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    dir TEXT NOT NULL,
+    folder TEXT NOT NULL,       -- owning folder relative to the root ('' for the root)
+    name_key TEXT NOT NULL,     -- lower-cased file name, for ordering
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    location TEXT,              -- 'keep' / 'delete' when inside keep/ or delete/
+    sidecar TEXT,               -- paired XMP sidecar path
+    pre_edited INTEGER NOT NULL DEFAULT 0,
+    mark TEXT,                  -- 'keep' / 'delete' / 'none' set in the culler, else NULL
+    rating INTEGER
+);
+CREATE INDEX IF NOT EXISTS files_order ON files (folder, name_key);
+CREATE INDEX IF NOT EXISTS files_dir ON files (dir);
+"""
+
+_MARK_WORDS = {MARK_KEEP: "keep", MARK_DELETE: "delete", MARK_NONE: "none"}
+_WORD_MARKS = {word: mark for mark, word in _MARK_WORDS.items()}
+
+
+def catalog_path(root: str) -> str:
+    """Default index location for a job root, outside the tree so it never changes its mtime."""
+    digest = hashlib.sha1(os.path.abspath(root).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CATALOG_DIR, f"{os.path.basename(os.path.abspath(root))}-{digest}.sqlite")
+
+
+def owning_folder(path: str) -> str:
+    """Folder whose keep/ and delete/ a file belongs to: its directory, or that one's parent."""
+    directory = os.path.dirname(path)
+    if os.path.basename(directory) in (KEEP_FOLDER, DELETE_FOLDER):
+        return os.path.dirname(directory)
+    return directory
+
+
+class Catalog:
+    """SQLite index of every RAW under root. Safe to use from several threads."""
+
+    def __init__(self, root: str, db_path: Optional[str] = None):
+        self.root = os.path.abspath(root)
+        db_path = db_path or catalog_path(self.root)
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        # WAL + NORMAL: each mark is its own commit without an fsync per commit
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+            self._conn.executescript(
+                "DROP TABLE IF EXISTS dirs; DROP TABLE IF EXISTS files;" + _SCHEMA
+                + f"PRAGMA user_version = {_SCHEMA_VERSION};"
+            )
+        self._conn.commit()
+
+    def rescan(self) -> Dict[str, int]:
+        """
+        Bring the index up to date with the tree. Returns counts of
+        directories checked and listed and files stat'ed.
+        """
+        stats = {"dirs_checked": 0, "dirs_listed": 0, "files_stated": 0}
+        with self._lock:
+            known = dict(self._conn.execute("SELECT path, mtime_ns FROM dirs"))
+            todo: List[str] = []
+            for directory, mtime_ns in known.items():
+                stats["dirs_checked"] += 1
+                try:
+                    changed = os.stat(directory).st_mtime_ns != mtime_ns
+                except OSError:
+                    self._forget_dir(directory)
+                    continue
+                if changed:
+                    todo.append(directory)
+            if self.root not in known:
+                todo.append(self.root)
+
+            queued = set(todo)
+            while todo:
+                for sub in self._index_dir(todo.pop(), stats):
+                    if sub not in known and sub not in queued:
+                        queued.add(sub)
+                        todo.append(sub)
+            self._conn.commit()
+        return stats
+
+    def _forget_dir(self, directory: str):
+        self._conn.execute("DELETE FROM dirs WHERE path = ?", (directory,))
+        self._conn.execute("DELETE FROM files WHERE dir = ?", (directory,))
+
+    def _index_dir(self, directory: str, stats: Dict[str, int]) -> List[str]:
+        """Re-list one directory, updating its files. Returns its subdirectories."""
+        try:
+            dir_mtime = os.stat(directory).st_mtime_ns  # before listing, so a racing change is seen next time
+            entries = list(os.scandir(directory))
+        except OSError:
+            self._forget_dir(directory)
+            return []
+        stats["dirs_listed"] += 1
+
+        base = os.path.basename(directory)
+        location = None
+        if directory != self.root and base in (KEEP_FOLDER, DELETE_FOLDER):
+            location = MARK_KEEP if base == KEEP_FOLDER else MARK_DELETE
+        owner = os.path.dirname(directory) if location else directory
+        folder = os.path.relpath(owner, self.root)
+        folder = "" if folder == "." else folder
+
+        subdirs = []
+        lower_names = {}
+        raws = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if not entry.name.startswith("."):
+                    subdirs.append(entry.path)
+            elif os.path.splitext(entry.name)[1].lower() in SUPPORTED_EXTENSIONS:
+                raws.append(entry)
+            else:
+                lower_names[entry.name.lower()] = entry.name
+
+        rows = []
+        for entry in raws:
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            stats["files_stated"] += 1
+            sidecar = match_sidecar(entry.name, lower_names)
+            sidecar_path = os.path.join(directory, sidecar) if sidecar else None
+            # Only root-level RAWs with an editor's sidecar are pre-edited, as in CullerModel
+            pre_edited = bool(location is None and sidecar_path and not is_culler_sidecar(sidecar_path))
+            rows.append((
+                entry.path, directory, folder, entry.name.lower(), st.st_size, st.st_mtime_ns,
+                location, sidecar_path, int(pre_edited),
+            ))
+
+        current = {row[0] for row in rows}
+        vanished = [
+            (path,) for (path,) in self._conn.execute("SELECT path FROM files WHERE dir = ?", (directory,))
+            if path not in current
+        ]
+        self._conn.executemany("DELETE FROM files WHERE path = ?", vanished)
+        self._conn.executemany(
+            "INSERT INTO files (path, dir, folder, name_key, size, mtime_ns, location, sidecar, pre_edited) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET size = excluded.size, mtime_ns = excluded.mtime_ns, "
+            "sidecar = excluded.sidecar, pre_edited = excluded.pre_edited",
+            rows,
+        )
+        self._conn.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?)", (directory, dir_mtime))
+        return subdirs
+
+    def entries(self) -> Iterator[Tuple[str, Optional[str], Optional[int], Optional[str]]]:
+        """
+        Yield (path, mark, rating, pre_edited_sidecar) in display order: by
+        owning folder, then name. mark is the culler's mark if one was set,
+        else the one implied by keep/ or delete/. pre_edited_sidecar is the
+        editor's sidecar for pre-edited files, else None.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, location, mark, rating, pre_edited, sidecar FROM files "
+                "ORDER BY folder, name_key"
+            ).fetchall()
+        for path, location, mark, rating, pre_edited, sidecar in rows:
+            yield (
+                path, location if mark is None else _WORD_MARKS[mark], rating,
+                sidecar if pre_edited else None,
+            )
+
+    def sizes(self) -> Dict[str, int]:
+        """File sizes as of the last rescan, for duplicate detection without a stat per file."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT path, size FROM files"))
+
+    def record(self, path: str, mark: Optional[str], rating: Optional[int] = None):
+        """Persist a mark (and rating, if given) set in the culler."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE files SET mark = ?, rating = COALESCE(?, rating) WHERE path = ?",
+                (_MARK_WORDS[mark], rating, path),
+            )
+            self._conn.commit()
+
+    def moved(self, renamed: Dict[str, str]):
+        """
+        Re-key rows for files a sort moved ({old path: new path}), so their
+        marks and ratings survive; the next rescan then sees them in place.
+        """
+        rows = []
+        for old, new in renamed.items():
+            directory = os.path.dirname(new)
+            base = os.path.basename(directory)
+            location = None
+            if directory != self.root and base in (KEEP_FOLDER, DELETE_FOLDER):
+                location = MARK_KEEP if base == KEEP_FOLDER else MARK_DELETE
+            rows.append((new, directory, os.path.basename(new).lower(), location, old))
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE OR REPLACE files SET path = ?, dir = ?, name_key = ?, location = ? "
+                "WHERE path = ?",
+                rows,
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
@@ -1,5 +1,7 @@
 """Configuration constants for RAW Image Culler."""
 
+import os
+
 SUPPORTED_EXTENSIONS = {
     ".cr2", ".cr3", ".nef", ".arw", ".orf",
     ".raf", ".dng", ".rw2", ".pef", ".srw",
@@ -12,6 +14,56 @@ CACHE_SIZE = PRELOAD_AHEAD + PRELOAD_BEHIND + 1  # 11
 
 THREAD_POOL_WORKERS = 4
 
+# How often the UI checks for the background folder scan at startup
+STARTUP_POLL_MS = 10
+
+# Preload order around the current frame: "linear" (lowest index first) or "ahead_first"
+PRELOAD_POLICY = "linear"
+
+# Embedded JPEG previews smaller than this (long edge, px) fall back to sips, as do
+# previews under this fraction of the sensor's long edge where the RAW records it
+# (Sony ARW's 1616 px preview, so the fit view and 100% zoom never upscale it)
+EMBEDDED_PREVIEW_MIN_EDGE = 1600
+EMBEDDED_PREVIEW_MIN_SCALE = 0.9
+
+# Duplicate detection: bytes hashed from each end before confirming with a full hash
+DUPLICATE_PARTIAL_BLOCK = 64 * 1024
+DUPLICATE_FULL_CHUNK = 8 * 1024 * 1024
+AUTO_MARK_DUPLICATES = True  # mark extra copies for delete at scan time
+
+# Compare view: scaled panel renditions kept (covers a 4-up window plus one step)
+RENDITION_CACHE_SIZE = 16
+COMPARE_PANEL_GAP = 4
+
+# 100% zoom: tile edge in pixels, tiles kept, and rotated full-res sources kept
+TILE_SIZE = 256
+TILE_CACHE_SIZE = 512
+ZOOM_SOURCE_CACHE_SIZE = 5  # a zoomed 4-up view plus the prefetched next frame
+
+# Thumbnail grid: thumbnail bounds, grid cell size, and the persistent store
+THUMB_SIZE = (160, 120)
+THUMB_JPEG_QUALITY = 80
+THUMB_MEMORY_CACHE = 800  # decoded thumbnails kept in memory
+GRID_CELL = (180, 150)
+GRID_PHOTO_CACHE = 300  # PhotoImages kept for recently visible cells
+THUMB_STORE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "raw_culler", "thumbnails.sqlite")
+THUMB_STORE_MAX_ENTRIES = 20000  # least recently used thumbnails beyond this are pruned on close (~100 MB)
+
+# Live folder watching: polling-backend interval (s) and UI pickup interval (ms)
+WATCH_POLL_INTERVAL = 1.0
+WATCH_UI_POLL_MS = 250
+
+# Metrics: histogram bucket bounds (s), default dump path, HUD refresh interval (ms)
+METRICS_ENABLED = True
+METRICS_BUCKETS = [
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+]
+METRICS_DUMP_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "raw_culler", "last_session_metrics.json",
+)
+HUD_REFRESH_MS = 500
+
 # Marks
 MARK_KEEP = "keep"
 MARK_DELETE = "delete"
@@ -21,6 +73,21 @@ MARK_NONE = None
 KEEP_FOLDER = "keep"
 DELETE_FOLDER = "delete"
 
+# Catalog mode: one SQLite index per job tree, named after a hash of its root
+CATALOG_DIR = os.path.join(os.path.expanduser("~"), ".cache", "raw_culler", "catalogs")
+
+# Decision import: files handed to execute_sort per batch
+DECISION_BATCH_SIZE = 1000
+
+# XMP sidecars: marks and star ratings written for Lightroom / darktable
+WRITE_XMP_SIDECARS = True
+XMP_SIDECAR_NAMING = "stem"  # "stem": IMG_0001.xmp (Lightroom), "full": IMG_0001.CR2.xmp (darktable)
+XMP_KEEP_LABEL = "Green"
+XMP_DELETE_LABEL = "Red"  # delete also sets xmp:Rating -1 (rejected)
+XMP_FLUSH_INTERVAL = 0.5  # longest the writer lets changes coalesce while more keep arriving
+XMP_QUIET_INTERVAL = 0.05  # a batch starts once no change has arrived for this long
+XMP_BATCH_SIZE = 256  # sidecars written and fsynced per group
+
 # UI colors
 COLOR_BG = "#0a0a0a"
 COLOR_KEEP = "#34d399"
@@ -32,6 +99,7 @@ COLOR_FILENAME = "#e4e4e7"
 COLOR_POSITION = "#f4f4f5"
 COLOR_REVIEW_BG = "#292524"
 COLOR_REVIEW_ACCENT = "#f59e0b"
+COLOR_DUPLICATE = "#f59e0b"
 
 # Pill badge colors (background tints)
 COLOR_KEEP_PILL_BG = "#064e3b"
@@ -47,5 +115,9 @@ OVERLAY_FLASH_MS = 400
 COLOR_OVERLAY_KEEP = "#34d399"
 COLOR_OVERLAY_DELETE = "#f87171"
 
+# Latency HUD
+COLOR_HUD_BG = "#000000"
+COLOR_HUD_FG = "#a3e635"
+
 # Status bar height
 STATUS_BAR_HEIGHT = 48
@@ -1,28 +1,51 @@
 """Data model: image list, marks, and undo stack."""
 
+import bisect
 import os
-from typing import Dict, List, Optional, Tuple
-from constants import SUPPORTED_EXTENSIONS, MARK_KEEP, MARK_DELETE, MARK_NONE, KEEP_FOLDER, DELETE_FOLDER
+from typing import Callable, Dict, List, Optional, Tuple
+from constants import (
+    SUPPORTED_EXTENSIONS, MARK_KEEP, MARK_DELETE, MARK_NONE, KEEP_FOLDER, DELETE_FOLDER,
+    AUTO_MARK_DUPLICATES,
+)
+from duplicates import find_duplicates
+from xmp_sidecar import find_sidecar, is_culler_sidecar
 
 
 def _find_xmp(raw_path: str) -> Optional[str]:
-    """Return the XMP sidecar path if one exists alongside the RAW file, else None."""
-    base = os.path.splitext(raw_path)[0]
-    for candidate in (base + ".xmp", base + ".XMP", raw_path + ".xmp", raw_path + ".XMP"):
-        if os.path.isfile(candidate):
-            return candidate
+    """
+    Return the sidecar path if the RAW has one from an editor, else None.
+    Sidecars this app wrote only to record marks don't count as edits.
+    """
+    xmp_path = find_sidecar(raw_path)
+    if xmp_path and not is_culler_sidecar(xmp_path):
+        return xmp_path
     return None
 
 
 class CullerModel:
-    def __init__(self, folder: str):
+    def __init__(self, folder: str, detect_duplicates: bool = True, catalog=None):
+        """
+        With a catalog (catalog.Catalog, already rescanned), the image list,
+        marks and ratings come from its index of the whole tree instead of
+        listing folder, keep/ and delete/, and changes are written back to it.
+        """
         self.folder = folder
+        self.catalog = catalog
         self.images: List[str] = []  # full paths
         self.marks: Dict[str, Optional[str]] = {}  # path -> mark
         self.initial_marks: Dict[str, Optional[str]] = {}  # marks at load time
         self.undo_stack: List[Tuple[str, Optional[str]]] = []  # (path, previous_mark)
         self.pre_edited: Dict[str, str] = {}  # raw_path -> xmp_path (auto-keep)
-        self._scan_folder()
+        self.duplicates: Dict[str, str] = {}  # duplicate_path -> original_path
+        self.ratings: Dict[str, int] = {}  # path -> stars (0-5) set in the culler
+        # Called with the path whenever its mark or rating changes (e.g. to write XMP)
+        self.on_change: Optional[Callable[[str], None]] = None
+        if catalog is not None:
+            self._load_catalog()
+        else:
+            self._scan_folder()
+        if detect_duplicates:
+            self._detect_duplicates()
 
     def _scan_folder(self):
         # Scan root folder (unmarked files), skipping any with XMP sidecars
@@ -59,6 +82,69 @@ class CullerModel:
             self.marks[path] = mark
             self.initial_marks[path] = mark
 
+    def _load_catalog(self):
+        for path, mark, rating, pre_edited_sidecar in self.catalog.entries():
+            if pre_edited_sidecar:
+                self.pre_edited[path] = pre_edited_sidecar
+                continue
+            self.images.append(path)
+            self.marks[path] = mark
+            self.initial_marks[path] = mark
+            if rating is not None:
+                self.ratings[path] = rating
+
+    def _detect_duplicates(self):
+        """Find byte-identical copies and optionally mark the extras for delete."""
+        self.apply_duplicates(find_duplicates(self.images))
+
+    def apply_duplicates(self, groups: List[List[str]]):
+        """
+        Record duplicate groups from find_duplicates(). The app hashes on a
+        background thread once the first image is up, then applies them here.
+        """
+        for group in groups:
+            # Keep a copy already in keep/, else the shortest name (no _1 suffix)
+            original = min(group, key=lambda p: (
+                self.marks.get(p) != MARK_KEEP, len(os.path.basename(p)),
+            ))
+            for path in group:
+                if path == original:
+                    continue
+                self.duplicates[path] = original
+                if AUTO_MARK_DUPLICATES and self.marks.get(path) == MARK_NONE:
+                    # Not recorded in initial_marks, so review treats these as session deletes
+                    self.marks[path] = MARK_DELETE
+                    self._changed(path)
+
+    def add_files(self, paths: List[str]) -> List[int]:
+        """
+        Insert files that arrived after the scan, without rescanning.
+        New RAWs go to their sorted position; a RAW whose XMP sidecar is
+        already present goes to pre_edited like at scan time. A sidecar that
+        arrives after its RAW was listed leaves the listed RAW alone.
+        Returns the final indices of inserted images, ascending.
+        """
+        inserted: List[int] = []
+        for path in sorted(paths):
+            name = os.path.basename(path)
+            if os.path.splitext(name)[1].lower() not in SUPPORTED_EXTENSIONS:
+                continue
+            if path in self.marks or path in self.pre_edited or not os.path.isfile(path):
+                continue
+            xmp_path = _find_xmp(path)
+            if xmp_path:
+                self.pre_edited[path] = xmp_path
+                continue
+            pos = bisect.bisect_right(
+                self.images, name.lower(), key=lambda p: os.path.basename(p).lower(),
+            )
+            self.images.insert(pos, path)
+            self.marks[path] = MARK_NONE
+            self.initial_marks[path] = MARK_NONE
+            inserted = [i + 1 if i >= pos else i for i in inserted]
+            inserted.append(pos)
+        return sorted(inserted)
+
     @property
     def count(self) -> int:
         return len(self.images)
@@ -70,6 +156,7 @@ class CullerModel:
         prev = self.marks.get(path, MARK_NONE)
         self.undo_stack.append((path, prev))
         self.marks[path] = mark
+        self._changed(path)
 
     def undo(self) -> Optional[str]:
         """Undo last mark. Returns the path that was restored, or None."""
@@ -77,8 +164,24 @@ class CullerModel:
             return None
         path, prev_mark = self.undo_stack.pop()
         self.marks[path] = prev_mark
+        self._changed(path)
         return path
 
+    def get_rating(self, path: str) -> Optional[int]:
+        """Stars set in the culler (this session, or an earlier one via the catalog), or None."""
+        return self.ratings.get(path)
+
+    def set_rating(self, path: str, stars: int):
+        """Set a 0-5 star rating. Ratings are not part of the undo stack."""
+        self.ratings[path] = max(0, min(5, stars))
+        self._changed(path)
+
+    def _changed(self, path: str):
+        if self.catalog is not None:
+            self.catalog.record(path, self.get_mark(path), self.ratings.get(path))
+        if self.on_change is not None:
+            self.on_change(path)
+
     def first_unmarked(self, start: int = 0) -> Optional[int]:
         """Return index of the first unmarked image at or after start, or None."""
         for i in range(start, self.count):
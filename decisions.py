@@ -0,0 +1,363 @@
+"""Headless import/export of keep/delete decisions.
+
+Marks live in the folder layout (root, keep/, delete/), so exporting is a
+listing of those three directories and importing is a stream of
+(file, decision) rows applied through file_mover.execute_sort in fixed-size
+batches. Rows are resolved against one listing of the folder built up
+front: by file name first, then by stem, so keeper lists that name JPEG
+siblings (IMG_0001.JPG) still reach the RAW. Decision files are read one
+row at a time, so memory does not grow with their length.
+
+Formats: CSV (file[,decision] with or without a header), JSON (an array
+of {"file", "decision"} objects or of bare names), JSON Lines, and plain
+text with one name per line. Rows without a decision get the default.
+Rows that can't be used (an unknown decision word, a JSON entry without a
+file name) are counted as invalid and skipped. A file that can't be read
+at all (a truncated JSON array) is rejected by a first streaming pass
+before anything moves.
+"""
+
+import csv
+import json
+import os
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from constants import (
+    SUPPORTED_EXTENSIONS, MARK_KEEP, MARK_DELETE, MARK_NONE, KEEP_FOLDER, DELETE_FOLDER,
+    DECISION_BATCH_SIZE,
+)
+from xmp_sidecar import is_culler_sidecar, match_sidecar
+
+FORMATS = ("csv", "json", "jsonl", "txt")
+
+# Words accepted in the decision column, lower-cased
+_DECISION_WORDS = {
+    "keep": MARK_KEEP, "k": MARK_KEEP, "pick": MARK_KEEP, "keeper": MARK_KEEP,
+    "yes": MARK_KEEP, "true": MARK_KEEP, "1": MARK_KEEP,
+    "delete": MARK_DELETE, "x": MARK_DELETE, "reject": MARK_DELETE, "rejected": MARK_DELETE,
+    "no": MARK_DELETE, "false": MARK_DELETE, "0": MARK_DELETE,
+    "none": MARK_NONE, "unmark": MARK_NONE, "unmarked": MARK_NONE, "u": MARK_NONE,
+}
+_FILE_COLUMNS = ("file", "filename", "name", "path")
+_DECISION_COLUMNS = ("decision", "mark", "label", "status")
+_JSON_CHUNK = 64 * 1024
+
+
+def detect_format(path: str) -> str:
+    """Guess the decision file format from its extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext == ".json":
+        return "json"
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    return "txt"
+
+
+def parse_decision(value) -> Optional[str]:
+    """Map a decision word to a mark, raising ValueError for unknown words."""
+    if isinstance(value, bool):
+        return MARK_KEEP if value else MARK_DELETE
+    word = str(value).strip().lower()
+    if word not in _DECISION_WORDS:
+        raise ValueError(f"Unknown decision: {value!r}")
+    return _DECISION_WORDS[word]
+
+
+def _mark_word(mark: Optional[str]) -> str:
+    return mark if mark is not None else "none"
+
+
+# ---------------------------------------------------------------------------
+# Folder listing
+# ---------------------------------------------------------------------------
+
+class FolderIndex:
+    """
+    One listing of folder, keep/ and delete/ for resolving decision rows.
+    RAWs with an editor's XMP sidecar in the root are pre-edited, as in
+    CullerModel, and are left alone; only those sidecars are opened.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.marks: Dict[str, Optional[str]] = {}  # path -> mark implied by location
+        self.pre_edited: Dict[str, str] = {}  # raw_path -> xmp_path
+        self._by_name: Dict[str, List[str]] = {}  # lower-cased name -> paths
+        self._by_stem: Dict[str, List[str]] = {}  # lower-cased stem -> paths
+        self._pre_edited_keys = set()  # lower-cased names and stems of pre_edited
+
+        root_names = os.listdir(folder)
+        lower_names = {name.lower(): name for name in root_names}
+        for subdir, mark in ((None, MARK_NONE), (KEEP_FOLDER, MARK_KEEP), (DELETE_FOLDER, MARK_DELETE)):
+            directory = folder if subdir is None else os.path.join(folder, subdir)
+            if subdir is None:
+                names = root_names
+            elif subdir in root_names and os.path.isdir(directory):
+                names = os.listdir(directory)
+            else:
+                continue
+            prefix = os.path.join(directory, "")
+            for name in names:
+                stem, ext = os.path.splitext(name)
+                if ext.lower() not in SUPPORTED_EXTENSIONS:
+                    continue
+                path = prefix + name
+                if subdir is None:
+                    xmp = match_sidecar(name, lower_names)
+                    if xmp and not is_culler_sidecar(os.path.join(folder, xmp)):
+                        self.pre_edited[path] = os.path.join(folder, xmp)
+                        self._pre_edited_keys.update((name.lower(), stem.lower()))
+                        continue
+                self.marks[path] = mark
+                self._by_name.setdefault(name.lower(), []).append(path)
+                self._by_stem.setdefault(stem.lower(), []).append(path)
+
+    @staticmethod
+    def _keys(name: str) -> Tuple[str, str]:
+        base = os.path.basename(name.replace("\\", "/")).strip().lower()
+        return base, os.path.splitext(base)[0]
+
+    def resolve(self, name: str) -> List[str]:
+        """Paths a decision row refers to: exact file name, else every RAW with that stem."""
+        base, stem = self._keys(name)
+        return self._by_name.get(base) or self._by_stem.get(stem, [])
+
+    def is_pre_edited(self, name: str) -> bool:
+        base, stem = self._keys(name)
+        return base in self._pre_edited_keys or stem in self._pre_edited_keys
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def _iter_csv(f) -> Iterator[Tuple[Optional[str], Optional[str]]]:
+    file_col, decision_col = 0, 1
+    first = True
+    for row in csv.reader(f):
+        if not row or not row[0].strip() or row[0].lstrip().startswith("#"):
+            continue
+        if first:
+            first = False
+            header = [cell.strip().lower() for cell in row]
+            if any(col in header for col in _FILE_COLUMNS):
+                file_col = next(header.index(c) for c in _FILE_COLUMNS if c in header)
+                decision_col = next((header.index(c) for c in _DECISION_COLUMNS if c in header), None)
+                continue
+        decision = None
+        if decision_col is not None and decision_col < len(row) and row[decision_col].strip():
+            decision = row[decision_col]
+        yield row[file_col], decision
+
+
+def _json_entry(value) -> Tuple[Optional[str], Optional[str]]:
+    """(file name, decision) of a JSON entry, or (None, reason) if it names no file."""
+    if isinstance(value, str):
+        return value, None
+    if isinstance(value, dict):
+        name = next((value[c] for c in _FILE_COLUMNS if c in value), None)
+        if name is not None:
+            decision = next((value[c] for c in _DECISION_COLUMNS if c in value), None)
+            return str(name), decision
+    return None, f"Unrecognised decision entry: {value!r}"
+
+
+def _iter_json_array(f) -> Iterator[Tuple[Optional[str], Optional[str]]]:
+    """Yield entries of a top-level JSON array, decoding one element at a time."""
+    decoder = json.JSONDecoder()
+    buf = f.read(_JSON_CHUNK).lstrip()
+    if not buf.startswith("["):
+        raise ValueError("Expected a JSON array of decisions")
+    pos = 1
+    while True:
+        # Skip whitespace and commas between elements, refilling as needed
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos == len(buf):
+            chunk = f.read(_JSON_CHUNK)
+            if not chunk:
+                raise ValueError("Unterminated JSON array")
+            buf, pos = chunk, 0
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            value, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            end = None
+        if end is None or end == len(buf):
+            # Element may continue past the buffer (a cut-off number decodes early)
+            chunk = f.read(_JSON_CHUNK)
+            if chunk:
+                buf, pos = buf[pos:] + chunk, 0
+                continue
+            if end is None:
+                raise ValueError("Truncated JSON array")
+        pos = end
+        yield _json_entry(value)
+
+
+def _iter_jsonl(f) -> Iterator[Tuple[Optional[str], Optional[str]]]:
+    for line in f:
+        if line.strip():
+            try:
+                value = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield None, f"Invalid JSON line: {e}"
+                continue
+            yield _json_entry(value)
+
+
+def _iter_txt(f) -> Iterator[Tuple[Optional[str], Optional[str]]]:
+    for line in f:
+        name = line.strip()
+        if name and not name.startswith("#"):
+            yield name, None
+
+
+def iter_decisions(
+    path: str, fmt: Optional[str] = None,
+) -> Iterator[Tuple[Optional[str], Optional[str]]]:
+    """
+    Stream (file name, decision word or None) rows from a decision file.
+    Rows that can't be read are yielded as (None, reason); a file that is
+    unreadable as a whole raises ValueError.
+    """
+    fmt = fmt or detect_format(path)
+    reader = {"csv": _iter_csv, "json": _iter_json_array, "jsonl": _iter_jsonl, "txt": _iter_txt}[fmt]
+    with open(path, newline="" if fmt == "csv" else None, encoding="utf-8-sig") as f:
+        yield from reader(f)
+
+
+# ---------------------------------------------------------------------------
+# Export / apply
+# ---------------------------------------------------------------------------
+
+def export_decisions(folder: str, out_path: str, fmt: Optional[str] = None) -> int:
+    """Write every RAW in folder with the mark its location implies. Returns the row count."""
+    fmt = fmt or detect_format(out_path)
+    index = FolderIndex(folder)
+    rows = sorted(index.marks.items(), key=lambda item: os.path.basename(item[0]).lower())
+    if fmt == "txt":
+        rows = [(p, m) for p, m in rows if m == MARK_KEEP]  # a plain keeper list
+    with open(out_path, "w", newline="" if fmt == "csv" else None, encoding="utf-8") as f:
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(["file", "decision"])
+            for path, mark in rows:
+                writer.writerow([os.path.basename(path), _mark_word(mark)])
+        elif fmt in ("json", "jsonl"):
+            # One object per line, so the array form streams back in as easily as JSON Lines
+            lines = (
+                json.dumps({"file": os.path.basename(p), "decision": _mark_word(m)})
+                for p, m in rows
+            )
+            if fmt == "json":
+                f.write("[\n" + ",\n".join(lines) + ("\n]\n" if rows else "]\n"))
+            else:
+                f.writelines(line + "\n" for line in lines)
+        else:
+            f.writelines(os.path.basename(p) + "\n" for p, _ in rows)
+    return len(rows)
+
+
+def apply_decisions(
+    folder: str, decisions_path: str, fmt: Optional[str] = None,
+    default: Optional[str] = MARK_KEEP, unlisted: Optional[str] = "leave",
+    dry_run: bool = False, batch_size: int = DECISION_BATCH_SIZE,
+) -> dict:
+    """
+    Apply a decision file to folder, moving files via execute_sort in
+    batches of batch_size. default is the mark for rows without a decision;
+    unlisted ("leave" or a mark) is applied to RAWs no row matched.
+    Invalid rows are skipped and counted. Returns counts and timings for
+    the throughput summary. Raises ValueError, before moving anything, if
+    the file can't be read as a whole.
+    """
+    from file_mover import execute_sort
+
+    start = time.perf_counter()
+    for _ in iter_decisions(decisions_path, fmt):
+        pass  # structural errors (e.g. a truncated JSON array) surface here, not mid-sort
+    t = time.perf_counter()
+    index = FolderIndex(folder)
+    listed_s = time.perf_counter() - t
+
+    stats = {
+        "rows": 0, "matched": 0, "unmatched": 0, "pre_edited_skipped": 0, "invalid": 0,
+        "invalid_rows": [], "keep": 0, "delete": 0, "none": 0, "unlisted": 0,
+        "changes": 0, "moved": 0, "errors": [], "listing_s": listed_s,
+    }
+    seen = set()
+    batch: Dict[str, Optional[str]] = {}
+
+    def flush():
+        stats["changes"] += len(batch)
+        if batch and not dry_run:
+            result = execute_sort(folder, batch)
+            stats["moved"] += result["moved"]
+            stats["errors"].extend(result["errors"])
+        batch.clear()
+
+    for name, decision in iter_decisions(decisions_path, fmt):
+        stats["rows"] += 1
+        try:
+            if name is None:
+                raise ValueError(decision)
+            mark = default if decision is None else parse_decision(decision)
+        except ValueError as e:
+            stats["invalid"] += 1
+            if len(stats["invalid_rows"]) < 20:
+                stats["invalid_rows"].append(f"row {stats['rows']}: {e}")
+            continue
+        paths = index.resolve(name)
+        if not paths:
+            key = "pre_edited_skipped" if index.is_pre_edited(name) else "unmatched"
+            stats[key] += 1
+            continue
+        stats["matched"] += 1
+        stats[_mark_word(mark)] += 1
+        for path in paths:
+            if path in seen:
+                continue  # first row for a file wins
+            seen.add(path)
+            if index.marks[path] != mark:
+                batch[path] = mark
+        if len(batch) >= batch_size:
+            flush()
+
+    if unlisted != "leave":
+        for path, mark in index.marks.items():
+            if path not in seen:
+                stats["unlisted"] += 1
+                if mark != unlisted:
+                    batch[path] = unlisted
+                if len(batch) >= batch_size:
+                    flush()
+    flush()
+
+    stats["elapsed_s"] = time.perf_counter() - start
+    return stats
+
+
+def format_summary(stats: dict, dry_run: bool = False) -> str:
+    """One-paragraph throughput summary for the CLI."""
+    elapsed = stats["elapsed_s"]
+    rate = stats["rows"] / elapsed if elapsed else 0.0
+    lines = [
+        f"{stats['rows']:,} rows in {elapsed:.2f}s ({rate:,.0f} rows/s, "
+        f"listing {stats['listing_s'] * 1000:.0f} ms)",
+        f"  matched {stats['matched']:,}: keep {stats['keep']:,}, delete {stats['delete']:,}, "
+        f"unmark {stats['none']:,}",
+        f"  unmatched {stats['unmatched']:,}, pre-edited skipped {stats['pre_edited_skipped']:,}, "
+        f"invalid {stats['invalid']:,}, unlisted {stats['unlisted']:,}",
+        f"  {stats['changes']:,} files change folder"
+        + (" (dry run, nothing moved)" if dry_run else
+           f", moved {stats['moved']:,}, {len(stats['errors'])} errors"),
+    ]
+    lines.extend(f"  invalid: {e}" for e in stats["invalid_rows"])
+    lines.extend(f"  error: {e}" for e in stats["errors"][:20])
+    return "\n".join(lines)
@@ -0,0 +1,102 @@
+"""Exact-duplicate detection using size grouping and partial hashing.
+
+Candidates are grouped by file size first. Within a size group, a fast
+hash of the header and tail blocks (read through mmap) separates files
+that differ; only when those partial hashes collide is the whole file
+hashed to confirm the match.
+"""
+
+import hashlib
+import mmap
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from constants import DUPLICATE_PARTIAL_BLOCK, DUPLICATE_FULL_CHUNK, THREAD_POOL_WORKERS
+
+
+def _partial_hash(path: str, size: int) -> Optional[bytes]:
+    """Hash the first and last DUPLICATE_PARTIAL_BLOCK bytes of a file."""
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            h = hashlib.blake2b(digest_size=16)
+            if size <= 2 * DUPLICATE_PARTIAL_BLOCK:
+                h.update(mm[:])
+            else:
+                h.update(mm[:DUPLICATE_PARTIAL_BLOCK])
+                h.update(mm[size - DUPLICATE_PARTIAL_BLOCK:])
+            return h.digest()
+    except (OSError, ValueError):
+        return None
+
+
+def _full_hash(path: str) -> Optional[bytes]:
+    """Hash the whole file in DUPLICATE_FULL_CHUNK slices."""
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            h = hashlib.blake2b(digest_size=16)
+            for offset in range(0, len(mm), DUPLICATE_FULL_CHUNK):
+                h.update(mm[offset:offset + DUPLICATE_FULL_CHUNK])
+            return h.digest()
+    except (OSError, ValueError):
+        return None
+
+
+def _group_by(pool: ThreadPoolExecutor, groups: List[List[str]], key_fn) -> List[List[str]]:
+    """
+    Split each group by key_fn, keeping sub-groups of two or more. Every
+    path of every group is submitted to the pool at once, so the workers
+    stay busy even when each group has only two members.
+    """
+    futures = [[(path, pool.submit(key_fn, path)) for path in group] for group in groups]
+    result: List[List[str]] = []
+    for group in futures:
+        buckets: Dict[bytes, List[str]] = defaultdict(list)
+        for path, future in group:
+            key = future.result()
+            if key is not None:
+                buckets[key].append(path)
+        result.extend(g for g in buckets.values() if len(g) > 1)
+    return result
+
+
+def find_duplicates(paths: List[str], sizes: Optional[Dict[str, int]] = None) -> List[List[str]]:
+    """
+    Return groups of byte-identical files among paths.
+    Each group keeps the input order of its members. Empty and
+    unreadable files are never reported. sizes holds sizes already known
+    (e.g. from the catalog), so those files are not stat'ed again.
+    """
+    sizes = sizes or {}
+    by_size: Dict[int, List[str]] = defaultdict(list)
+    for path in paths:
+        size = sizes.get(path)
+        if size is None:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+        if size > 0:
+            by_size[size].append(path)
+
+    candidates = [(size, group) for size, group in by_size.items() if len(group) > 1]
+    if not candidates:
+        return []
+
+    sizes = {path: size for size, group in candidates for path in group}
+    with ThreadPoolExecutor(max_workers=THREAD_POOL_WORKERS) as pool:
+        partial_groups = _group_by(
+            pool, [group for _, group in candidates], lambda p: _partial_hash(p, sizes[p]),
+        )
+        # Small files were hashed whole by the partial hash already
+        groups = [g for g in partial_groups if sizes[g[0]] <= 2 * DUPLICATE_PARTIAL_BLOCK]
+        groups.extend(_group_by(
+            pool, [g for g in partial_groups if sizes[g[0]] > 2 * DUPLICATE_PARTIAL_BLOCK], _full_hash,
+        ))
+
+    order = {path: i for i, path in enumerate(paths)}
+    for group in groups:
+        group.sort(key=order.__getitem__)
+    groups.sort(key=lambda g: order[g[0]])
+    return groups
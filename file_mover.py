@@ -5,6 +5,46 @@ import shutil
 from typing import Dict, List, Optional
 
 from constants import MARK_KEEP, MARK_DELETE, KEEP_FOLDER, DELETE_FOLDER
+import metrics
+
+
+def _sidecars(path: str, listings: Dict[str, Dict[str, str]]) -> List[str]:
+    """
+    XMP sidecars of the RAW at path (IMG.xmp, IMG.CR2.xmp, any case), found
+    in one cached listing per directory rather than a stat per file.
+    """
+    directory, name = os.path.split(path)
+    listing = listings.get(directory)
+    if listing is None:
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            names = []
+        listing = {n.lower(): n for n in names if n.lower().endswith(".xmp")}
+        listings[directory] = listing
+    stem = os.path.splitext(name)[0]
+    found = []
+    for candidate in (stem + ".xmp", name + ".xmp"):
+        match = listing.get(candidate.lower())
+        if match and match not in found:
+            found.append(match)
+    return [os.path.join(directory, n) for n in found]
+
+
+def _move_sidecars(src: str, dest: str, listings: Dict[str, Dict[str, str]]) -> int:
+    """Move src's sidecars next to dest, renamed to match if dest was made unique."""
+    moved = 0
+    src_name, dest_name = os.path.basename(src), os.path.basename(dest)
+    for sidecar in _sidecars(src, listings):
+        name = os.path.basename(sidecar)
+        if name.lower().startswith(src_name.lower()):
+            new_name = dest_name + name[len(src_name):]  # IMG.CR2.xmp form
+        else:
+            new_name = os.path.splitext(dest_name)[0] + os.path.splitext(name)[1]
+        shutil.move(sidecar, _unique_dest(os.path.join(os.path.dirname(dest), new_name)))
+        listings[os.path.dirname(src)].pop(name.lower(), None)  # e.g. IMG.CR2 + IMG.DNG share it
+        moved += 1
+    return moved
 
 
 def _unique_dest(dest_path: str) -> str:
@@ -20,6 +60,7 @@ def _unique_dest(dest_path: str) -> str:
         counter += 1
 
 
+@metrics.timed("execute_sort_seconds")
 def execute_sort(
     folder: str,
     marks: Dict[str, Optional[str]],
@@ -30,7 +71,9 @@ def execute_sort(
     Files already in the correct subfolder are skipped.
     Unmarked files in subfolders are moved back to the root.
     Pre-edited files (RAW + XMP pairs) are moved to keep/.
-    Returns {"moved": int, "pre_edited_moved": int, "errors": list[str]}.
+    Other RAWs take their XMP sidecars (e.g. written by XmpWriter) along.
+    Returns {"moved": int, "pre_edited_moved": int, "sidecars_moved": int,
+    "renamed": {old path: new path} of moved marked files, "errors": list[str]}.
     """
     keep_dir = os.path.join(folder, KEEP_FOLDER)
     delete_dir = os.path.join(folder, DELETE_FOLDER)
@@ -39,7 +82,10 @@ def execute_sort(
 
     moved = 0
     pre_edited_moved = 0
+    sidecars_moved = 0
+    renamed: Dict[str, str] = {}
     errors = []
+    listings: Dict[str, Dict[str, str]] = {}  # directory -> lower-cased xmp name -> name
 
     for path, mark in marks.items():
         current_dir = os.path.dirname(path)
@@ -64,6 +110,8 @@ def execute_sort(
         try:
             shutil.move(path, dest)
             moved += 1
+            renamed[path] = dest
+            sidecars_moved += _move_sidecars(path, dest, listings)
         except Exception as e:
             errors.append(f"{filename}: {e}")
 
@@ -78,4 +126,39 @@ def execute_sort(
             except Exception as e:
                 errors.append(f"{filename}: {e}")
 
-    return {"moved": moved, "pre_edited_moved": pre_edited_moved, "errors": errors}
+    metrics.inc("files_moved_total", moved + pre_edited_moved + sidecars_moved)
+    return {
+        "moved": moved, "pre_edited_moved": pre_edited_moved,
+        "sidecars_moved": sidecars_moved, "renamed": renamed, "errors": errors,
+    }
+
+
+def execute_sort_tree(
+    marks: Dict[str, Optional[str]],
+    pre_edited: Optional[Dict[str, str]] = None,
+) -> dict:
+    """
+    execute_sort for a catalog spanning many folders: each file is sorted
+    into the keep/ and delete/ of the folder it belongs to. Folders with
+    nothing to move are not touched. Returns the summed execute_sort result.
+    """
+    from catalog import owning_folder
+
+    groups: Dict[str, Dict[str, Optional[str]]] = {}
+    for path, mark in marks.items():
+        folder = owning_folder(path)
+        if mark is None and folder == os.path.dirname(path):
+            continue  # unmarked and already in place
+        groups.setdefault(folder, {})[path] = mark
+    pre_groups: Dict[str, Dict[str, str]] = {}
+    for raw_path, xmp_path in (pre_edited or {}).items():
+        pre_groups.setdefault(os.path.dirname(raw_path), {})[raw_path] = xmp_path
+
+    total = {"moved": 0, "pre_edited_moved": 0, "sidecars_moved": 0, "renamed": {}, "errors": []}
+    for folder in sorted(set(groups) | set(pre_groups)):
+        result = execute_sort(folder, groups.get(folder, {}), pre_groups.get(folder))
+        for key in ("moved", "pre_edited_moved", "sidecars_moved"):
+            total[key] += result[key]
+        total["renamed"].update(result["renamed"])
+        total["errors"].extend(result["errors"])
+    return total
@@ -0,0 +1,145 @@
+"""Watch a folder for files that arrive after the initial scan.
+
+On Linux, inotify (through ctypes, no extra dependency) reports files
+once they are closed after writing or renamed into place, so card copies
+still in progress are never picked up half-written. Elsewhere, the
+folder is polled, and a new file is reported only once its size has
+stayed the same across two polls.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+from typing import Dict, List, Optional, Set
+
+from constants import WATCH_POLL_INTERVAL
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+
+def _inotify_libc():
+    """Return libc if it exposes inotify, else None."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    except OSError:
+        return None
+    if not (hasattr(libc, "inotify_init1") and hasattr(libc, "inotify_add_watch")):
+        return None
+    return libc
+
+
+class FolderWatcher:
+    """
+    Background watcher for new files directly inside folder.
+    New paths are collected with drain() from the UI thread.
+    """
+
+    def __init__(self, folder: str, interval: float = WATCH_POLL_INTERVAL):
+        self.folder = folder
+        self.interval = interval
+        self._found: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._inotify_fd: Optional[int] = None
+
+        libc = _inotify_libc()
+        if libc is not None:
+            fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+            if fd >= 0:
+                wd = libc.inotify_add_watch(
+                    fd, os.fsencode(folder), _IN_CLOSE_WRITE | _IN_MOVED_TO,
+                )
+                if wd >= 0:
+                    self._inotify_fd = fd
+                else:
+                    os.close(fd)
+        self.backend = "inotify" if self._inotify_fd is not None else "polling"
+
+    def start(self):
+        if self._inotify_fd is not None:
+            target, args = self._run_inotify, ()
+        else:
+            # Snapshot before returning so files arriving right after start are not missed
+            target, args = self._run_polling, (set(self._list_files()),)
+        self._thread = threading.Thread(target=target, args=args, name="folder-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+        if self._inotify_fd is not None:
+            os.close(self._inotify_fd)
+            self._inotify_fd = None
+
+    def drain(self) -> List[str]:
+        """Paths of files that appeared since the last call."""
+        found = []
+        while True:
+            try:
+                found.append(self._found.get_nowait())
+            except queue.Empty:
+                return found
+
+    def _run_inotify(self):
+        fd = self._inotify_fd
+        while not self._stop.is_set():
+            ready, _, _ = select.select([fd], [], [], self.interval)
+            if not ready:
+                continue
+            try:
+                data = os.read(fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            except OSError:
+                return
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if name:
+                    self._found.put(os.path.join(self.folder, os.fsdecode(name)))
+
+    def _run_polling(self, known: Set[str]):
+        growing: Dict[str, int] = {}  # name -> size at the previous poll
+        while not self._stop.wait(self.interval):
+            current = self._list_files()
+            for name, size in current.items():
+                if name in known:
+                    continue
+                if growing.get(name) == size:
+                    known.add(name)
+                    del growing[name]
+                    self._found.put(os.path.join(self.folder, name))
+                else:
+                    growing[name] = size
+            known.intersection_update(current)
+            for name in [n for n in growing if n not in current]:
+                del growing[name]
+
+    def _list_files(self) -> Dict[str, int]:
+        files = {}
+        try:
+            with os.scandir(self.folder) as it:
+                for entry in it:
+                    try:
+                        if entry.is_file():
+                            files[entry.name] = entry.stat().st_size
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return files
@@ -1,7 +1,9 @@
 """RAW preview extraction with threaded preloading and LRU cache.
 
-Uses macOS built-in 'sips' to convert RAW files to JPEG, avoiding
-third-party binary compatibility issues with rawpy/libraw.
+Prefers the full-size JPEG preview embedded in the RAW file (a seek and a
+JPEG decode), and falls back to macOS built-in 'sips' to convert RAW
+files to JPEG, avoiding third-party binary compatibility issues with
+rawpy/libraw.
 """
 
 import os
@@ -9,18 +11,33 @@ import subprocess
 import tempfile
 import threading
 from collections import OrderedDict
-from concurrent.futures import ThreadPoolExecutor
-from typing import List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
 from PIL import Image, ImageDraw, ImageFont, ImageOps
 
-from constants import CACHE_SIZE, THREAD_POOL_WORKERS, PRELOAD_AHEAD, PRELOAD_BEHIND
+from constants import (
+    CACHE_SIZE, THREAD_POOL_WORKERS, PRELOAD_AHEAD, PRELOAD_BEHIND, PRELOAD_POLICY, RENDITION_CACHE_SIZE,
+    EMBEDDED_PREVIEW_MIN_EDGE, EMBEDDED_PREVIEW_MIN_SCALE,
+)
+from raw_container import read_embedded_jpeg
+import metrics
 
 # Shared temp directory for converted previews
 _TEMP_DIR = tempfile.mkdtemp(prefix="raw_culler_")
 
 
+@metrics.timed("extract_preview_seconds")
 def _extract_preview(path: str) -> Image.Image:
-    """Convert RAW to JPEG using macOS sips and load it."""
+    """Load the embedded full-size preview, or convert RAW to JPEG using macOS sips."""
+    try:
+        img = read_embedded_jpeg(
+            path, largest=True,
+            min_edge=EMBEDDED_PREVIEW_MIN_EDGE, min_scale=EMBEDDED_PREVIEW_MIN_SCALE,
+        )
+    except Exception:
+        img = None  # damaged container: let sips try
+    if img is not None:
+        return img
     try:
         tmp_path = os.path.join(_TEMP_DIR, os.path.basename(path) + ".jpg")
         result = subprocess.run(
@@ -56,41 +73,157 @@ def _placeholder(text: str, size=(800, 600)) -> Image.Image:
 
 
 class ImageLoader:
-    def __init__(self, paths: List[str]):
+    """
+    LRU cache of full previews with background preloading around the current index.
+    The keyword arguments default to the constants and exist so trace replays
+    can compare settings; on_extract is called with each path whose preview
+    was extracted (on a worker thread for preloads).
+    """
+
+    def __init__(
+        self, paths: List[str],
+        preload_ahead: int = PRELOAD_AHEAD,
+        preload_behind: int = PRELOAD_BEHIND,
+        workers: int = THREAD_POOL_WORKERS,
+        policy: str = PRELOAD_POLICY,
+        cache_size: Optional[int] = None,
+        on_extract: Optional[Callable[[str], None]] = None,
+    ):
+        if policy not in ("linear", "ahead_first"):
+            raise ValueError(f"Unknown preload policy: {policy}")
         self.paths = paths
+        self.preload_ahead = preload_ahead
+        self.preload_behind = preload_behind
+        self.policy = policy
+        self.cache_size = cache_size or max(CACHE_SIZE, preload_ahead + preload_behind + 1)
+        self._on_extract = on_extract
         self._cache: OrderedDict[str, Image.Image] = OrderedDict()
         self._lock = threading.Lock()
-        self._pool = ThreadPoolExecutor(max_workers=THREAD_POOL_WORKERS)
-
-    def get(self, index: int) -> Image.Image:
-        """Get image at index, loading if needed. Triggers preload."""
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        # Separate pool so on-screen renditions never queue behind preloads
+        self._render_pool = ThreadPoolExecutor(max_workers=workers)
+        self._inflight: Dict[str, Future] = {}  # preloads submitted but not finished
+        self._renditions: OrderedDict[Tuple[str, int, Tuple[int, int]], Image.Image] = OrderedDict()
+
+    def get(self, index: int, preload: bool = True) -> Image.Image:
+        """Get image at index, loading if needed. Triggers preload unless disabled."""
         if not self.paths:
             return _placeholder("No images found")
-        path = self.paths[index]
-        img = self._cache_get(path)
-        if img is None:
-            img = _extract_preview(path)
-            self._cache_put(path, img)
-        self._preload(index)
+        with metrics.timer("loader_get_seconds"):
+            path = self.paths[index]
+            img = self._cache_get(path)
+            if img is None:
+                metrics.inc("cache_misses_total")
+                with self._lock:
+                    pending = self._inflight.get(path)
+                    # Still queued behind other preloads: take it over and extract inline
+                    if pending is not None and pending.cancel():
+                        self._inflight.pop(path, None)
+                        metrics.set_gauge("preload_queue_depth", len(self._inflight))
+                        pending = None
+                if pending is not None:
+                    # Already being extracted: waiting beats extracting it twice
+                    pending.result()
+                    img = self._cache_get(path)
+                if img is None:
+                    img = self._extract(path)
+                    self._cache_put(path, img)
+            else:
+                metrics.inc("cache_hits_total")
+            if preload:
+                self._preload(index)
+            return img
+
+    def is_cached(self, index: int) -> bool:
+        """Whether get(index) would be served from the cache."""
+        with self._lock:
+            return self.paths[index] in self._cache
+
+    def renditions(
+        self, requests: List[Tuple[int, int, Tuple[int, int]]], center: Optional[int] = None,
+    ) -> List[Image.Image]:
+        """
+        Decode and scale several images at once, in parallel.
+        Each request is (index, rotation, (max_w, max_h)); the result for it
+        is the image rotated clockwise and fitted inside that box. Preloading
+        is triggered around center when given.
+        """
+        futures = [self._render_pool.submit(self._rendition, *req) for req in requests]
+        results = [f.result() for f in futures]
+        if center is not None and self.paths:
+            self._preload(center)
+        return results
+
+    def _rendition(self, index: int, rotation: int, box: Tuple[int, int]) -> Image.Image:
+        key = (self.paths[index], rotation, box)
+        with self._lock:
+            if key in self._renditions:
+                self._renditions.move_to_end(key)
+                return self._renditions[key]
+
+        img = self.get(index, preload=False)
+        iw, ih = img.size
+        if rotation in (90, 270):
+            box = (box[1], box[0])  # fit before rotating, which is far cheaper
+        scale = min(box[0] / iw, box[1] / ih)
+        img = img.resize(
+            (max(1, int(iw * scale)), max(1, int(ih * scale))),
+            resample=Image.Resampling.BILINEAR, reducing_gap=2.0,
+        )
+        if rotation:
+            img = img.rotate(-rotation, expand=True)  # negative because PIL rotates CCW
+
+        with self._lock:
+            self._renditions[key] = img
+            self._renditions.move_to_end(key)
+            while len(self._renditions) > RENDITION_CACHE_SIZE:
+                self._renditions.popitem(last=False)
         return img
 
+    def refresh(self, center: int):
+        """Re-run preloading around center, e.g. after files were inserted into paths."""
+        if self.paths:
+            self._preload(center)
+
+    def _preload_order(self, center: int) -> List[int]:
+        """
+        Indices to preload around center, in submission order.
+        linear: lowest index first (behind, then ahead).
+        ahead_first: ahead frames nearest first, then behind frames nearest first.
+        """
+        start = max(0, center - self.preload_behind)
+        end = min(len(self.paths), center + self.preload_ahead + 1)
+        if self.policy == "ahead_first":
+            return list(range(center, end)) + list(range(center - 1, start - 1, -1))
+        return list(range(start, end))
+
     def _preload(self, center: int):
         """Submit preload tasks for images around center index."""
-        start = max(0, center - PRELOAD_BEHIND)
-        end = min(len(self.paths), center + PRELOAD_AHEAD + 1)
-        for i in range(start, end):
+        for i in self._preload_order(center):
             path = self.paths[i]
             with self._lock:
-                if path in self._cache:
+                if path in self._cache or path in self._inflight:
                     continue
-            self._pool.submit(self._load_into_cache, path)
+                self._inflight[path] = self._pool.submit(self._load_into_cache, path)
+                metrics.set_gauge("preload_queue_depth", len(self._inflight))
 
     def _load_into_cache(self, path: str):
-        with self._lock:
-            if path in self._cache:
-                return
+        try:
+            with self._lock:
+                if path in self._cache:
+                    return
+            img = self._extract(path)
+            self._cache_put(path, img)
+        finally:
+            with self._lock:
+                self._inflight.pop(path, None)
+                metrics.set_gauge("preload_queue_depth", len(self._inflight))
+
+    def _extract(self, path: str) -> Image.Image:
         img = _extract_preview(path)
-        self._cache_put(path, img)
+        if self._on_extract is not None:
+            self._on_extract(path)
+        return img
 
     def _cache_get(self, path: str) -> Optional[Image.Image]:
         with self._lock:
@@ -103,11 +236,12 @@ class ImageLoader:
         with self._lock:
             self._cache[path] = img
             self._cache.move_to_end(path)
-            while len(self._cache) > CACHE_SIZE:
+            while len(self._cache) > self.cache_size:
                 self._cache.popitem(last=False)
 
     def shutdown(self):
         self._pool.shutdown(wait=False)
+        self._render_pool.shutdown(wait=False)
         # Clean up temp directory
         try:
             for f in os.listdir(_TEMP_DIR):
@@ -1,19 +1,112 @@
 #!/usr/bin/env python3
-"""RAW Image Culler - Fast review and sorting of RAW photo files."""
+"""RAW Image Culler - Fast review and sorting of RAW photo files.
 
+    main.py [FOLDER]                       open the culler
+    main.py --catalog JOB                  open every subfolder of JOB from a persistent index
+    main.py export FOLDER OUT              write current decisions (CSV / JSON / JSONL / TXT)
+    main.py import FOLDER DECISIONS        apply decisions without opening a window
+"""
+
+import time
+_STARTED = time.perf_counter()  # before any other import, for startup metrics
+
+import argparse
+import atexit
 import sys
 import os
-from tkinter import filedialog
-import tkinter as tk
 
-from app import CullerApp
+from constants import METRICS_DUMP_PATH, MARK_KEEP, MARK_DELETE, MARK_NONE
+import metrics
+
+DECISION_COMMANDS = ("export", "import", "apply")
+
+
+def decisions_main(argv):
+    """Headless export / import of decisions (see decisions.py)."""
+    import decisions
+
+    parser = argparse.ArgumentParser(prog="main.py", description="Export or apply culling decisions.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="write the marks implied by keep/ and delete/")
+    export.add_argument("folder")
+    export.add_argument("out", help="output file; .txt writes a plain keeper list")
+    export.add_argument("--format", choices=decisions.FORMATS, help="default: from the extension")
+
+    marks = {"keep": MARK_KEEP, "delete": MARK_DELETE, "none": MARK_NONE}
+    apply = commands.add_parser(
+        "import", aliases=["apply"], help="move files into keep/ and delete/ from a decision file",
+    )
+    apply.add_argument("folder")
+    apply.add_argument("decisions", help="CSV, JSON, JSON Lines or a plain list of file names")
+    apply.add_argument("--format", choices=decisions.FORMATS, help="default: from the extension")
+    apply.add_argument("--default", choices=list(marks), default="keep",
+                       help="decision for rows that name a file only (default: keep)")
+    apply.add_argument("--unlisted", choices=["leave", *marks], default="leave",
+                       help="what to do with RAWs the file does not mention (default: leave)")
+    apply.add_argument("--dry-run", action="store_true", help="report what would move")
+    args = parser.parse_args(argv)
+
+    folder = os.path.abspath(args.folder)
+    if not os.path.isdir(folder):
+        print(f"Error: '{folder}' is not a valid directory.")
+        sys.exit(1)
+
+    if args.command == "export":
+        count = decisions.export_decisions(folder, args.out, args.format)
+        print(f"Exported {count:,} decisions to {args.out}")
+        return
+
+    try:
+        stats = decisions.apply_decisions(
+            folder, args.decisions, args.format,
+            default=marks[args.default],
+            unlisted="leave" if args.unlisted == "leave" else marks[args.unlisted],
+            dry_run=args.dry_run,
+        )
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(decisions.format_summary(stats, dry_run=args.dry_run))
+    if stats["errors"] or stats["invalid"]:
+        sys.exit(1)
 
 
 def main():
-    if len(sys.argv) > 1:
-        folder = sys.argv[1]
+    if len(sys.argv) > 1 and sys.argv[1] in DECISION_COMMANDS:
+        decisions_main(sys.argv[1:])
+        return
+
+    from app import CullerApp
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("folder", nargs="?", help="folder of RAW images (omit for a picker)")
+    parser.add_argument(
+        "--metrics-out", default=METRICS_DUMP_PATH,
+        help="where to dump session latency metrics on exit "
+             "(.prom/.txt for Prometheus text, otherwise JSON)",
+    )
+    parser.add_argument(
+        "--record-trace", metavar="FILE",
+        help="record keystrokes and resulting positions for session_trace.py replay",
+    )
+    parser.add_argument(
+        "--catalog", action="store_true",
+        help="cull the whole tree of subfolders, indexed in a persistent SQLite catalog "
+             "that is rescanned incrementally and remembers marks and ratings",
+    )
+    parser.add_argument(
+        "--quit-when-ready", action="store_true",
+        help="exit once the first image is on screen (used by benchmark.py for startup time)",
+    )
+    args = parser.parse_args()
+
+    if args.folder:
+        folder = args.folder
     else:
         # No argument — open folder picker
+        import tkinter as tk
+        from tkinter import filedialog
         root = tk.Tk()
         root.withdraw()
         folder = filedialog.askdirectory(title="Select folder with RAW images")
@@ -27,8 +120,12 @@ def main():
         print(f"Error: '{folder}' is not a valid directory.")
         sys.exit(1)
 
+    atexit.register(metrics.dump, args.metrics_out)
     print(f"Opening RAW Culler for: {folder}")
-    CullerApp(folder)
+    CullerApp(
+        folder, trace_path=args.record_trace,
+        started=_STARTED, quit_when_ready=args.quit_when_ready, catalog=args.catalog,
+    )
 
 
 if __name__ == "__main__":
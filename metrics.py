@@ -0,0 +1,193 @@
+"""Low-overhead hot-path timing, counters, and histograms.
+
+Instrumented code calls timer()/timed()/inc()/set_gauge() on the
+module-level registry. Recording is a perf_counter pair, a bisect into
+fixed buckets and a short lock, so it stays on in normal use; set
+METRICS_ENABLED to False to make every call a no-op. The registry can be
+rendered for the on-canvas HUD and dumped as JSON or Prometheus text.
+"""
+
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from constants import METRICS_ENABLED, METRICS_BUCKETS
+
+_lock = threading.Lock()
+
+
+class Histogram:
+    """Cumulative histogram over fixed bucket upper bounds (seconds)."""
+
+    def __init__(self, bounds: List[float] = METRICS_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.last = 0.0
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.bounds, value)
+        with _lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+            self.last = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile as the upper bound of the bucket that holds it."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+        return self.bounds[-1]
+
+
+_histograms: Dict[str, Histogram] = {}
+_counters: Dict[str, int] = {}
+_gauges: Dict[str, float] = {}
+
+
+def observe(name: str, seconds: float):
+    if not METRICS_ENABLED:
+        return
+    hist = _histograms.get(name)
+    if hist is None:
+        hist = _histograms.setdefault(name, Histogram())
+    hist.observe(seconds)
+
+
+def inc(name: str, amount: int = 1):
+    if METRICS_ENABLED:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + amount
+
+
+def set_gauge(name: str, value: float):
+    if METRICS_ENABLED:
+        _gauges[name] = value
+
+
+class timer:
+    """Context manager that records the duration of its block into a histogram."""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def timed(name: str):
+    """Decorator form of timer()."""
+    def decorate(fn):
+        if not METRICS_ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _gauges.clear()
+
+
+def snapshot() -> dict:
+    """Plain-dict view of every metric, as written to JSON."""
+    with _lock:
+        return {
+            "histograms": {
+                name: {
+                    "count": h.count,
+                    "sum": h.sum,
+                    "last": h.last,
+                    "p50": h.quantile(0.5),
+                    "p99": h.quantile(0.99),
+                    "buckets": dict(zip([*map(str, h.bounds), "+Inf"], h.counts)),
+                }
+                for name, h in sorted(_histograms.items())
+            },
+            "counters": dict(sorted(_counters.items())),
+            "gauges": dict(sorted(_gauges.items())),
+        }
+
+
+def to_prometheus(prefix: str = "raw_culler_") -> str:
+    """Render every metric in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        for name, h in sorted(_histograms.items()):
+            metric = prefix + name
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, n in zip([*map(repr, h.bounds), "+Inf"], h.counts):
+                cumulative += n
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f"{metric}_sum {h.sum!r}")
+            lines.append(f"{metric}_count {h.count}")
+        for name, value in sorted(_counters.items()):
+            lines.append(f"# TYPE {prefix}{name} counter")
+            lines.append(f"{prefix}{name} {value}")
+        for name, value in sorted(_gauges.items()):
+            lines.append(f"# TYPE {prefix}{name} gauge")
+            lines.append(f"{prefix}{name} {value!r}")
+    return "\n".join(lines) + "\n"
+
+
+def hud_lines() -> List[str]:
+    """Short per-metric summary lines for the on-canvas HUD."""
+    snap = snapshot()
+    lines = []
+    for name, h in snap["histograms"].items():
+        p50 = f"{h['p50'] * 1000:.1f}" if h["p50"] is not None else "-"
+        p99 = f"{h['p99'] * 1000:.1f}" if h["p99"] is not None else "-"
+        lines.append(
+            f"{name:<28} n={h['count']:<6} last={h['last'] * 1000:7.1f}ms  "
+            f"p50≤{p50}ms  p99≤{p99}ms"
+        )
+    for name, value in snap["counters"].items():
+        lines.append(f"{name:<28} {value}")
+    for name, value in snap["gauges"].items():
+        lines.append(f"{name:<28} {value:g}")
+    return lines
+
+
+def dump(path: str):
+    """Write all metrics to path: Prometheus text for .prom/.txt, JSON otherwise."""
+    if not (_histograms or _counters or _gauges):
+        return
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if path.endswith((".prom", ".txt")):
+            text = to_prometheus()
+        else:
+            text = json.dumps(snapshot(), indent=2) + "\n"
+        with open(path, "w") as f:
+            f.write(text)
+    except OSError:
+        pass
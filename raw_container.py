@@ -0,0 +1,173 @@
+"""Locate and decode the JPEG previews embedded in RAW containers.
+
+Every supported RAW format carries ready-made JPEGs: TIFF-structured
+files (CR2, NEF, ARW, DNG, PEF, SRW, RW2, ORF) reference them from IFD1
+and JPEG-compressed SubIFDs, CR3 stores them in THMB and PRVW boxes, and
+RAF points at one from its fixed header. Reading one of these is a seek
+and a JPEG decode, with no demosaicing. Many embedded previews are
+reduced-size (CR3's PRVW and Sony's ARW preview are about 1620 px), so a
+preview only counts as full-size when it is close to the sensor size the
+TIFF IFDs record; CR3's boxes never do.
+"""
+
+import io
+import os
+import struct
+from typing import List, Optional, Set, Tuple
+from PIL import Image, ImageOps
+
+_TIFF_TYPE_SIZES = {3: 2, 4: 4, 13: 4}  # SHORT, LONG, IFD
+_MAX_IFDS = 32
+
+_ORIENTATION_TRANSPOSE = {
+    3: Image.Transpose.ROTATE_180,
+    6: Image.Transpose.ROTATE_270,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+def _read_tiff_jpegs(f, data_len: int) -> Tuple[List[Tuple[int, int]], int, int]:
+    """
+    Walk a TIFF-structured RAW and return ((offset, length) of every
+    embedded JPEG, IFD0 orientation, longest ImageWidth / ImageLength of
+    any IFD, which is the sensor size, or 0 if none is recorded).
+    """
+    f.seek(0)
+    header = f.read(8)
+    if header[:2] == b"II":
+        endian = "<"
+    elif header[:2] == b"MM":
+        endian = ">"
+    else:
+        return [], 1, 0
+    # 42 = TIFF/DNG/NEF/CR2/ARW/PEF/SRW, 0x55 = RW2, 0x4F52/0x5352 = ORF
+    magic = struct.unpack(endian + "H", header[2:4])[0]
+    if magic not in (42, 0x55, 0x4F52, 0x5352):
+        return [], 1, 0
+
+    jpegs = []
+    orientation = 1
+    sensor_edge = 0
+    pending = [struct.unpack(endian + "I", header[4:8])[0]]
+    seen: Set[int] = set()
+    while pending and len(seen) < _MAX_IFDS:
+        ifd = pending.pop(0)
+        if ifd in seen or not 8 <= ifd < data_len:
+            continue
+        seen.add(ifd)
+        f.seek(ifd)
+        count = struct.unpack(endian + "H", f.read(2))[0]
+        raw = f.read(count * 12 + 4)
+        if len(raw) < count * 12 + 4:
+            continue
+
+        tags = {}
+        for i in range(count):
+            tag, typ, n, value = struct.unpack(endian + "HHI4s", raw[i * 12:i * 12 + 12])
+            size = _TIFF_TYPE_SIZES.get(typ)
+            if size is None or n == 0:
+                continue
+            if n * size <= 4:
+                fmt = endian + ("H" if size == 2 else "I") * n
+                tags[tag] = struct.unpack(fmt, value[:n * size])
+            elif tag == 0x14A:  # SubIFDs stored out of line
+                f.seek(struct.unpack(endian + "I", value)[0])
+                tags[tag] = struct.unpack(endian + "I" * n, f.read(4 * n))
+        if len(seen) == 1 and 0x112 in tags:
+            orientation = tags[0x112][0]
+        sensor_edge = max(sensor_edge, tags.get(0x100, (0,))[0], tags.get(0x101, (0,))[0])
+
+        # JPEGInterchangeFormat / Length (classic IFD1 thumbnail)
+        if 0x201 in tags and 0x202 in tags:
+            jpegs.append((tags[0x201][0], tags[0x202][0]))
+        # Single-strip JPEG-compressed previews (DNG / NEF SubIFDs)
+        elif tags.get(0x103, (0,))[0] in (6, 7) and 0x111 in tags and len(tags[0x111]) == 1:
+            jpegs.append((tags[0x111][0], tags.get(0x117, (0,))[0]))
+
+        pending.extend(tags.get(0x14A, ()))
+        next_ifd = struct.unpack(endian + "I", raw[count * 12:count * 12 + 4])[0]
+        if next_ifd:
+            pending.append(next_ifd)
+    return jpegs, orientation, sensor_edge
+
+
+def _read_cr3_boxes(f) -> List[Tuple[int, int]]:
+    """Locate the JPEGs inside the CR3 THMB (small) and PRVW (~1620 px) boxes."""
+    f.seek(0)
+    head = f.read(1024 * 1024)
+    found = []
+    # THMB: version/flags(4) width(2) height(2) jpeg_size(4) unknown(4) then the JPEG
+    # PRVW: version/flags(4) unknown(2) width(2) height(2) unknown(2) jpeg_size(4) then the JPEG
+    for tag, size_at in ((b"THMB", 12), (b"PRVW", 16)):
+        pos = head.find(tag)
+        if pos < 0:
+            continue
+        jpeg_size = struct.unpack(">I", head[pos + size_at:pos + size_at + 4])[0]
+        soi = head.find(b"\xff\xd8", pos + size_at + 4, pos + size_at + 16)
+        if soi >= 0:
+            found.append((soi, jpeg_size))
+    return found
+
+
+def _read_raf_preview(f) -> Optional[Tuple[int, int]]:
+    """Fuji RAF files store their JPEG offset and length at a fixed header position."""
+    f.seek(84)
+    offset, length = struct.unpack(">II", f.read(8))
+    return offset, length
+
+
+def embedded_jpegs(path: str, full_size: bool = False) -> Tuple[List[Tuple[int, int]], int, int]:
+    """
+    Return ((offset, length) of each embedded JPEG that fits in the file,
+    orientation, sensor long edge or 0 if unknown) for a RAW file. Unknown
+    or damaged containers give ([], 1, 0). full_size leaves out previews
+    known to be reduced-size (CR3 THMB / PRVW).
+    """
+    try:
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            magic = f.read(16)
+            orientation, sensor_edge = 1, 0
+            if magic.startswith(b"FUJIFILMCCD-RAW"):
+                candidates = [_read_raf_preview(f)]
+            elif magic[4:12] == b"ftypcrx ":
+                candidates = [] if full_size else _read_cr3_boxes(f)
+            else:
+                candidates, orientation, sensor_edge = _read_tiff_jpegs(f, size)
+    except Exception:  # damaged containers are common on half-copied cards
+        return [], 1, 0
+    fits = [c for c in candidates if c and c[1] > 0 and c[0] + c[1] <= size]
+    return fits, orientation, sensor_edge
+
+
+def read_embedded_jpeg(
+    path: str, largest: bool = False, draft: Optional[Tuple[int, int]] = None,
+    min_edge: int = 0, min_scale: float = 0.0,
+) -> Optional[Image.Image]:
+    """
+    Decode the smallest (or largest full-size) embedded JPEG, oriented for
+    display. draft lets libjpeg decode at a reduced scale when only a small
+    image is needed. Returns None when there is no usable JPEG, or when its
+    long edge is shorter than min_edge or, where the container records the
+    sensor size, than min_scale times the sensor's long edge.
+    """
+    try:
+        candidates, orientation, sensor_edge = embedded_jpegs(path, full_size=largest)
+        with open(path, "rb") as f:
+            for offset, length in sorted(candidates, key=lambda c: c[1], reverse=largest):
+                f.seek(offset)
+                data = f.read(length)
+                if not data.startswith(b"\xff\xd8"):
+                    continue
+                img = Image.open(io.BytesIO(data))
+                if max(img.size) < max(min_edge, min_scale * sensor_edge):
+                    return None
+                if draft:
+                    img.draft("RGB", draft)
+                if orientation in _ORIENTATION_TRANSPOSE:
+                    return img.convert("RGB").transpose(_ORIENTATION_TRANSPOSE[orientation])
+                # No container orientation (always so for RAF and CR3): use the JPEG's own EXIF
+                return ImageOps.exif_transpose(img).convert("RGB")
+    except Exception:
+        pass
+    return None
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""Navigation trace recording and deterministic headless replay.
+
+CullerApp can record a session trace (main.py --record-trace FILE): a
+JSON-lines file whose first line is a header and every following line
+is one keystroke with its time offset and the index it led to. Replaying
+a trace drives CullerModel and ImageLoader without Tk at the original
+timing, and reports how long each step blocked, the cache hit rate, and
+how much preload work was wasted, so PRELOAD_AHEAD, THREAD_POOL_WORKERS
+and preload policies can be tuned against real sessions.
+
+Usage:
+    python session_trace.py TRACE --folder /path/to/raws
+    python session_trace.py TRACE --synthetic --workers 2 --policy ahead_first
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from benchmark import _percentile, make_fixtures
+from constants import PRELOAD_AHEAD, PRELOAD_BEHIND, THREAD_POOL_WORKERS, PRELOAD_POLICY
+
+
+class TraceRecorder:
+    """Appends one JSON line per keystroke; lines are flushed as they are written."""
+
+    def __init__(self, path: str, folder: str, count: int):
+        self._start = time.monotonic()
+        self._file = open(path, "w", buffering=1)
+        self._write({
+            "trace": 1, "folder": folder, "count": count,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        })
+
+    def record(self, key: str, index: int):
+        self._write({"t": round(time.monotonic() - self._start, 4), "key": key, "index": index})
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def _write(self, entry: dict):
+        if not self._file.closed:
+            self._file.write(json.dumps(entry) + "\n")
+
+
+def load_trace(path: str):
+    """Return (header, events) from a trace file."""
+    with open(path) as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    if not lines or lines[0].get("trace") != 1:
+        raise ValueError(f"{path} is not a RAW Culler trace")
+    return lines[0], lines[1:]
+
+
+def replay(
+    events: List[dict], folder: str, speed: float = 1.0,
+    preload_ahead: int = PRELOAD_AHEAD, preload_behind: int = PRELOAD_BEHIND,
+    workers: int = THREAD_POOL_WORKERS, policy: str = PRELOAD_POLICY,
+    cache_size: Optional[int] = None,
+) -> Dict:
+    """
+    Replay events against the images in folder and report per-step blocking
+    time, cache hit rate and wasted preload work. speed > 1 replays faster.
+    Only index changes touch the loader, as in the app. Frame 0 is loaded
+    before the first event, untimed, as the app does at startup.
+    """
+    from culler_model import CullerModel
+    from image_loader import ImageLoader
+
+    model = CullerModel(folder, detect_duplicates=False)  # the app hashes after the first image
+    if model.count == 0:
+        raise ValueError(f"No supported RAW files found in {folder}")
+
+    extracted: Counter = Counter()
+    extracted_lock = threading.Lock()
+
+    def on_extract(path):
+        with extracted_lock:
+            extracted[path] += 1
+
+    loader = ImageLoader(
+        model.images, preload_ahead=preload_ahead, preload_behind=preload_behind,
+        workers=workers, policy=policy, cache_size=cache_size, on_extract=on_extract,
+    )
+
+    loader.get(0)  # startup: the first image is up and preloading before any key
+    steps = []
+    displayed = {model.images[0]}
+    current = 0
+    start = time.monotonic()
+    for event in events:
+        due = start + event["t"] / speed
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        index = min(event["index"], model.count - 1)
+        if index == current:
+            continue
+        current = index
+        hit = loader.is_cached(index)
+        t = time.perf_counter()
+        loader.get(index)
+        blocked_ms = (time.perf_counter() - t) * 1000
+        displayed.add(model.images[index])
+        steps.append({"t": event["t"], "key": event.get("key"), "index": index,
+                      "hit": hit, "blocked_ms": round(blocked_ms, 3)})
+
+    loader.shutdown()
+    with extracted_lock:
+        total = sum(extracted.values())
+        never_shown = sum(n for p, n in extracted.items() if p not in displayed)
+        repeated = sum(n - 1 for p, n in extracted.items() if p in displayed and n > 1)
+
+    blocked = [s["blocked_ms"] for s in steps]
+    hits = sum(1 for s in steps if s["hit"])
+    return {
+        "settings": {
+            "preload_ahead": preload_ahead, "preload_behind": preload_behind,
+            "workers": workers, "policy": policy, "cache_size": loader.cache_size,
+            "speed": speed,
+        },
+        "steps": len(steps),
+        "hit_rate": hits / len(steps) if steps else None,
+        "blocked_total_ms": round(sum(blocked), 3),
+        "blocked_p50_ms": _percentile(blocked, 50),
+        "blocked_p99_ms": _percentile(blocked, 99),
+        "blocked_max_ms": max(blocked, default=None),
+        "extractions": total,
+        "wasted_never_displayed": never_shown,
+        "wasted_repeated": repeated,
+        "per_step": steps,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a RAW Culler navigation trace headlessly.")
+    parser.add_argument("trace")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--folder", help="folder of RAWs (default: the folder in the trace header)")
+    source.add_argument("--synthetic", action="store_true",
+                        help="replay against generated fixtures with the trace's file count")
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--preload-ahead", type=int, default=PRELOAD_AHEAD)
+    parser.add_argument("--preload-behind", type=int, default=PRELOAD_BEHIND)
+    parser.add_argument("--workers", type=int, default=THREAD_POOL_WORKERS)
+    parser.add_argument("--policy", choices=["linear", "ahead_first"], default=PRELOAD_POLICY)
+    parser.add_argument("--cache-size", type=int, help="default: CACHE_SIZE, or ahead + behind + 1 if larger")
+    parser.add_argument("--out", help="write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    header, events = load_trace(args.trace)
+    tmpdir = None
+    if args.synthetic:
+        tmpdir = tempfile.mkdtemp(prefix="raw_culler_replay_")
+        folder = os.path.join(tmpdir, "fixtures")
+        make_fixtures(folder, header["count"], xmp_ratio=0)
+    else:
+        folder = args.folder or header["folder"]
+
+    try:
+        report = replay(
+            events, folder, speed=args.speed,
+            preload_ahead=args.preload_ahead, preload_behind=args.preload_behind,
+            workers=args.workers, policy=args.policy, cache_size=args.cache_size,
+        )
+    finally:
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    print(
+        f"{report['steps']} steps, hit rate {report['hit_rate'] or 0:.1%}, "
+        f"blocked p99 {report['blocked_p99_ms'] or 0:.1f} ms, "
+        f"{report['wasted_never_displayed']} of {report['extractions']} extractions never shown",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Catalog rescans re-list only changed directories and follow the tree as it changes."""
+
+import os
+
+from catalog import Catalog
+from constants import MARK_KEEP, MARK_DELETE, KEEP_FOLDER
+
+
+def _touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"raw")
+
+
+def _bump(directory):
+    """Give a directory a new mtime even on filesystems with coarse timestamps."""
+    st = os.stat(directory)
+    os.utime(directory, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+def _names(catalog):
+    return sorted(os.path.relpath(path, catalog.root) for path, *_ in catalog.entries())
+
+
+def _job(tmp_path):
+    job = tmp_path / "job"
+    for day in ("day1", "day2"):
+        for i in range(2):
+            _touch(str(job / day / f"IMG_{i}.CR2"))
+    _touch(str(job / "day1" / KEEP_FOLDER / "K.NEF"))
+    return job
+
+
+def test_unchanged_tree_lists_nothing(tmp_path):
+    job = _job(tmp_path)
+    catalog = Catalog(str(job), str(tmp_path / "c.sqlite"))
+    first = catalog.rescan()
+    assert first["dirs_listed"] == 4 and first["files_stated"] == 5
+    again = catalog.rescan()
+    assert again == {"dirs_checked": 4, "dirs_listed": 0, "files_stated": 0}
+    marks = {os.path.basename(p): m for p, m, _, _ in catalog.entries()}
+    assert marks["K.NEF"] == MARK_KEEP and marks["IMG_0.CR2"] is None
+
+
+def test_rescan_after_adding_removing_and_renaming_subfolders(tmp_path):
+    job = _job(tmp_path)
+    catalog = Catalog(str(job), str(tmp_path / "c.sqlite"))
+    catalog.rescan()
+
+    _touch(str(job / "day3" / "NEW.ARW"))  # added
+    for name in os.listdir(job / "day2"):  # removed
+        os.unlink(job / "day2" / name)
+    os.rmdir(job / "day2")
+    os.rename(job / "day1", job / "day1-renamed")  # renamed
+    _bump(str(job))
+
+    stats = catalog.rescan()
+    # Only the root and the new or renamed subtrees are listed
+    assert stats["dirs_listed"] == 4
+    assert _names(catalog) == [
+        "day1-renamed/IMG_0.CR2", "day1-renamed/IMG_1.CR2", "day1-renamed/keep/K.NEF",
+        "day3/NEW.ARW",
+    ]
+    assert catalog.rescan()["dirs_listed"] == 0
+
+
+def test_marks_and_ratings_persist_and_follow_a_move(tmp_path):
+    job = _job(tmp_path)
+    db = str(tmp_path / "c.sqlite")
+    catalog = Catalog(str(job), db)
+    catalog.rescan()
+    src = str(job / "day1" / "IMG_0.CR2")
+    catalog.record(src, MARK_DELETE, 4)
+    catalog.close()
+
+    catalog = Catalog(str(job), db)
+    catalog.rescan()
+    assert [(m, r) for p, m, r, _ in catalog.entries() if p == src] == [(MARK_DELETE, 4)]
+
+    dest = str(job / "day1" / "delete" / "IMG_0.CR2")
+    os.makedirs(os.path.dirname(dest))
+    os.rename(src, dest)
+    catalog.moved({src: dest})
+    catalog.rescan()
+    assert [(m, r) for p, m, r, _ in catalog.entries() if p == dest] == [(MARK_DELETE, 4)]
+    assert src not in [p for p, *_ in catalog.entries()]
@@ -0,0 +1,77 @@
+"""Decision files: every format streams rows, and invalid rows are skipped, not fatal."""
+
+import json
+
+import pytest
+
+from constants import KEEP_FOLDER, DELETE_FOLDER, MARK_KEEP, MARK_DELETE, MARK_NONE
+from decisions import apply_decisions, iter_decisions, parse_decision
+
+
+@pytest.fixture
+def folder(tmp_path):
+    photos = tmp_path / "photos"
+    photos.mkdir()
+    for i in range(4):
+        (photos / f"IMG_{i}.CR2").write_bytes(b"raw")
+    return photos
+
+
+def test_csv_with_header_and_invalid_row(tmp_path):
+    path = tmp_path / "d.csv"
+    path.write_text("file,decision\nIMG_0.CR2,keep\n# note\nIMG_1.CR2,bogus\nIMG_2.CR2,\n")
+    assert list(iter_decisions(str(path))) == [
+        ("IMG_0.CR2", "keep"), ("IMG_1.CR2", "bogus"), ("IMG_2.CR2", None),
+    ]
+    with pytest.raises(ValueError):
+        parse_decision("bogus")
+
+
+def test_json_array_of_objects_and_names(tmp_path):
+    path = tmp_path / "d.json"
+    path.write_text(json.dumps([{"file": "IMG_0.CR2", "decision": "x"}, "IMG_1.CR2", {"other": 1}]))
+    rows = list(iter_decisions(str(path)))
+    assert rows[:2] == [("IMG_0.CR2", "x"), ("IMG_1.CR2", None)]
+    assert rows[2][0] is None  # no file name: yielded as invalid, not raised
+
+
+def test_truncated_json_array_is_rejected_before_anything_moves(folder, tmp_path):
+    path = tmp_path / "d.json"
+    path.write_text('[{"file": "IMG_0.CR2", "decision": "delete"}, {"file": "IMG_1')
+    with pytest.raises(ValueError):
+        apply_decisions(str(folder), str(path))
+    assert (folder / "IMG_0.CR2").exists()
+
+
+def test_jsonl_with_unparseable_line(tmp_path):
+    path = tmp_path / "d.jsonl"
+    path.write_text('{"file": "IMG_0.CR2", "decision": "pick"}\nnot json\n\n{"name": "IMG_1.CR2"}\n')
+    rows = list(iter_decisions(str(path)))
+    assert rows[0] == ("IMG_0.CR2", "pick")
+    assert rows[1][0] is None
+    assert rows[2] == ("IMG_1.CR2", None)
+
+
+def test_apply_skips_invalid_rows_and_moves_the_rest(folder, tmp_path):
+    path = tmp_path / "d.csv"
+    path.write_text("IMG_0.CR2,keep\nIMG_1.CR2,bogus\nIMG_2.CR2,reject\nIMG_9.CR2,keep\n")
+    stats = apply_decisions(str(folder), str(path))
+    assert stats["invalid"] == 1 and stats["unmatched"] == 1
+    assert stats["keep"] == 1 and stats["delete"] == 1
+    assert (folder / KEEP_FOLDER / "IMG_0.CR2").exists()
+    assert (folder / DELETE_FOLDER / "IMG_2.CR2").exists()
+    assert (folder / "IMG_1.CR2").exists()
+
+
+def test_dry_run_moves_nothing(folder, tmp_path):
+    path = tmp_path / "keepers.txt"
+    path.write_text("IMG_0.JPG\n")  # matched by stem
+    stats = apply_decisions(str(folder), str(path), unlisted=MARK_DELETE, dry_run=True)
+    assert stats["matched"] == 1 and stats["unlisted"] == 3 and stats["changes"] == 4
+    assert sorted(p.name for p in folder.iterdir()) == [f"IMG_{i}.CR2" for i in range(4)]
+
+
+def test_decision_words():
+    assert parse_decision("Pick") == MARK_KEEP
+    assert parse_decision(False) == MARK_DELETE
+    assert parse_decision("u") == MARK_NONE
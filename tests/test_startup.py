@@ -0,0 +1,37 @@
+"""Cold-start budget: main.py and app.py must import without the heavy modules."""
+
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_BUDGET_S = 0.2  # same as benchmark.py's startup_imports_s target
+DEFERRED = ["PIL", "culler_model", "image_loader", "tile_cache", "thumbnails", "duplicates", "catalog"]
+
+_PROBE = """
+import json, sys, time
+t = time.perf_counter()
+import main, app
+elapsed = time.perf_counter() - t
+print(json.dumps({"elapsed": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def _probe():
+    proc = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(proc.stdout)
+
+
+def test_heavy_modules_are_not_imported_at_startup():
+    modules = set(_probe()["modules"])
+    loaded = [name for name in DEFERRED if name in modules]
+    assert not loaded, f"imported before the window exists: {loaded}"
+
+
+def test_startup_imports_within_budget():
+    # Best of three, so one slow run on a busy machine doesn't fail the test
+    elapsed = min(_probe()["elapsed"] for _ in range(3))
+    assert elapsed < IMPORT_BUDGET_S, f"main + app imported in {elapsed:.3f}s"
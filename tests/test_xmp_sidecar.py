@@ -0,0 +1,68 @@
+"""render_sidecar merges marks into existing sidecars without losing anything."""
+
+import re
+
+from constants import MARK_KEEP, MARK_DELETE, MARK_NONE
+from xmp_sidecar import render_sidecar, is_culler_sidecar
+
+LIGHTROOM = b"""<x:xmpmeta xmlns:x="adobe:ns:meta/">
+ <rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">
+  <rdf:Description rdf:about=""
+    xmlns:xmp="http://ns.adobe.com/xap/1.0/"
+    xmlns:crs="http://ns.adobe.com/camera-raw-settings/1.0/"
+    xmlns:dc="http://purl.org/dc/elements/1.1/"
+    xmp:Rating="4" xmp:Label="Blue" crs:Exposure2012="+0.50">
+   <dc:subject><rdf:Bag><rdf:li>wedding</rdf:li></rdf:Bag></dc:subject>
+  </rdf:Description>
+ </rdf:RDF>
+</x:xmpmeta>
+"""
+
+
+def _fields(data: bytes) -> dict:
+    return dict(re.findall(rb'(xmp:Rating|xmp:Label)="([^"]*)"', data))
+
+
+def _foreign_fields_kept(data: bytes):
+    assert b'crs:Exposure2012="+0.50"' in data
+    assert b"<rdf:li>wedding</rdf:li>" in data
+
+
+def test_delete_then_unmark_restores_rating_and_label():
+    deleted = render_sidecar(LIGHTROOM, MARK_DELETE)
+    assert _fields(deleted) == {b"xmp:Rating": b"-1", b"xmp:Label": b"Red"}
+    restored = render_sidecar(deleted, MARK_NONE)
+    assert _fields(restored) == {b"xmp:Rating": b"4", b"xmp:Label": b"Blue"}
+    assert b"rawculler:Previous" not in restored
+    _foreign_fields_kept(restored)
+
+
+def test_keep_delete_unmark_round_trip():
+    data = render_sidecar(LIGHTROOM, MARK_KEEP)
+    assert _fields(data) == {b"xmp:Rating": b"4", b"xmp:Label": b"Green"}
+    data = render_sidecar(data, MARK_DELETE)
+    assert _fields(data) == {b"xmp:Rating": b"-1", b"xmp:Label": b"Red"}
+    data = render_sidecar(data, MARK_NONE)
+    assert _fields(data) == {b"xmp:Rating": b"4", b"xmp:Label": b"Blue"}
+    _foreign_fields_kept(data)
+
+
+def test_delete_twice_keeps_the_saved_rating():
+    data = render_sidecar(render_sidecar(LIGHTROOM, MARK_DELETE), MARK_DELETE)
+    assert _fields(render_sidecar(data, MARK_KEEP))[b"xmp:Rating"] == b"4"
+
+
+def test_rating_set_while_deleted_applies_once_undeleted():
+    data = render_sidecar(render_sidecar(LIGHTROOM, MARK_DELETE), MARK_DELETE, 2)
+    assert _fields(data)[b"xmp:Rating"] == b"-1"
+    assert _fields(render_sidecar(data, MARK_NONE))[b"xmp:Rating"] == b"2"
+
+
+def test_new_sidecar_is_marked_as_ours(tmp_path):
+    path = tmp_path / "IMG_0001.xmp"
+    path.write_bytes(render_sidecar(None, MARK_KEEP, 3))
+    assert _fields(path.read_bytes()) == {b"xmp:Rating": b"3", b"xmp:Label": b"Green"}
+    assert is_culler_sidecar(str(path))
+    edited = tmp_path / "IMG_0002.xmp"
+    edited.write_bytes(render_sidecar(LIGHTROOM, MARK_KEEP))
+    assert not is_culler_sidecar(str(edited))
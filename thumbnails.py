@@ -0,0 +1,199 @@
+"""Embedded thumbnail extraction, persistent thumbnail store, and async loader.
+
+Thumbnails for the grid come from the smallest JPEG every RAW format
+embeds (see raw_container), so no demosaicing or sips call is needed.
+Each thumbnail is downscaled, re-encoded as a small JPEG, and kept in a
+single SQLite file keyed by path, size and mtime, so reopening a folder
+never extracts twice. The store keeps the THUMB_STORE_MAX_ENTRIES most
+recently used thumbnails, so it doesn't grow with every job opened.
+"""
+
+import io
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Set, Tuple
+from PIL import Image
+
+from constants import (
+    THUMB_SIZE, THUMB_JPEG_QUALITY, THUMB_MEMORY_CACHE, THUMB_STORE_PATH, THUMB_STORE_MAX_ENTRIES,
+    THREAD_POOL_WORKERS,
+)
+from image_loader import _extract_preview
+from raw_container import read_embedded_jpeg
+
+
+def extract_embedded_thumbnail(path: str) -> Optional[Image.Image]:
+    """Return the smallest embedded JPEG preview of a RAW file, oriented for display."""
+    return read_embedded_jpeg(path, draft=THUMB_SIZE)
+
+
+def make_thumbnail(path: str) -> Tuple[Image.Image, bool]:
+    """
+    Embedded thumbnail if available, else a downscaled full preview.
+    Returns (thumbnail, embedded); only embedded thumbnails are worth
+    persisting, since the fallback may be a placeholder.
+    """
+    img = extract_embedded_thumbnail(path)
+    embedded = img is not None
+    if img is None:
+        img = _extract_preview(path)
+    img.thumbnail(THUMB_SIZE, Image.Resampling.BILINEAR, reducing_gap=2.0)
+    return img, embedded
+
+
+_STORE_SCHEMA_VERSION = 2  # 2 added last-used times for pruning
+
+
+class ThumbnailStore:
+    """Compact persistent thumbnail store: one SQLite file of small JPEGs."""
+
+    def __init__(self, db_path: str = THUMB_STORE_PATH, max_entries: int = THUMB_STORE_MAX_ENTRIES):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != _STORE_SCHEMA_VERSION:
+            # Only a cache, so an old layout is simply rebuilt
+            self._conn.executescript(
+                "DROP TABLE IF EXISTS thumbs;"
+                "CREATE TABLE thumbs ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, jpeg BLOB, used REAL);"
+                f"PRAGMA user_version = {_STORE_SCHEMA_VERSION};"
+            )
+        self._conn.commit()
+        self._uncommitted = 0
+
+    def get(self, path: str, st: os.stat_result) -> Optional[Image.Image]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT jpeg FROM thumbs WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (path, st.st_size, st.st_mtime_ns),
+            ).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE thumbs SET used = ? WHERE path = ?", (time.time(), path))
+        if row is None:
+            return None
+        img = Image.open(io.BytesIO(row[0]))
+        img.load()
+        return img
+
+    def put(self, path: str, st: os.stat_result, img: Image.Image):
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=THUMB_JPEG_QUALITY)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO thumbs VALUES (?, ?, ?, ?, ?)",
+                (path, st.st_size, st.st_mtime_ns, buf.getvalue(), time.time()),
+            )
+            self._uncommitted += 1
+            if self._uncommitted >= 100:
+                self._conn.commit()
+                self._uncommitted = 0
+
+    def prune(self) -> int:
+        """Drop the least recently used thumbnails beyond max_entries. Returns how many."""
+        with self._lock:
+            excess = self._conn.execute("SELECT COUNT(*) FROM thumbs").fetchone()[0] - self.max_entries
+            if excess <= 0:
+                return 0
+            self._conn.execute(
+                "DELETE FROM thumbs WHERE path IN (SELECT path FROM thumbs ORDER BY used LIMIT ?)",
+                (excess,),
+            )
+            self._conn.commit()
+            return excess
+
+    def close(self):
+        self.prune()
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+
+class ThumbnailLoader:
+    """
+    Loads grid thumbnails in the background.
+    request() never blocks; finished paths are collected with drain()
+    from the UI thread, which then reads them with get(). Thumbnails are
+    keyed by path, so inserting files into paths never invalidates them.
+    """
+
+    def __init__(self, paths: List[str], store: Optional[ThumbnailStore] = None):
+        self.paths = paths
+        self._store = store
+        self._cache: OrderedDict[str, Image.Image] = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=THREAD_POOL_WORKERS)
+        self._queued: Set[str] = set()
+        self._wanted: Set[str] = set()
+        self._done: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+
+    def get(self, index: int) -> Optional[Image.Image]:
+        path = self.paths[index]
+        with self._lock:
+            img = self._cache.get(path)
+            if img is not None:
+                self._cache.move_to_end(path)
+            return img
+
+    def request(self, indices: Iterable[int]):
+        """Queue loads for indices; anything requested earlier but no longer wanted is skipped."""
+        wanted = [self.paths[i] for i in indices]
+        with self._lock:
+            self._wanted = set(wanted)
+            todo = [p for p in wanted if p not in self._cache and p not in self._queued]
+            self._queued.update(todo)
+        for path in todo:
+            self._pool.submit(self._load, path)
+
+    def drain(self) -> List[str]:
+        """Paths whose thumbnails finished loading since the last call."""
+        done = []
+        while True:
+            try:
+                done.append(self._done.get_nowait())
+            except queue.Empty:
+                return done
+
+    @property
+    def pending(self) -> bool:
+        with self._lock:
+            return bool(self._queued)
+
+    def _load(self, path: str):
+        try:
+            with self._lock:
+                if path not in self._wanted:
+                    return  # scrolled away before we got to it
+            img = None
+            st = None
+            if self._store is not None:
+                try:
+                    st = os.stat(path)
+                    img = self._store.get(path, st)
+                except OSError:
+                    st = None
+            if img is None:
+                img, embedded = make_thumbnail(path)
+                if embedded and self._store is not None and st is not None:
+                    self._store.put(path, st, img)
+            with self._lock:
+                self._cache[path] = img
+                self._cache.move_to_end(path)
+                while len(self._cache) > THUMB_MEMORY_CACHE:
+                    self._cache.popitem(last=False)
+            self._done.put(path)
+        finally:
+            with self._lock:
+                self._queued.discard(path)
+
+    def shutdown(self):
+        # Let running loads finish their put() before the store closes
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        if self._store is not None:
+            self._store.close()
@@ -0,0 +1,158 @@
+"""Tiled 100% zoom: full-resolution previews cut into cached tiles.
+
+The full-resolution preview comes from ImageLoader (decoded once and
+kept in its LRU cache); this module rotates it for display, cuts only
+the tiles a view needs, and keeps recently used tiles in an LRU cache.
+Tiles for the next frame's zoom region can be prefetched in the
+background so stepping through a burst while zoomed stays instant.
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from PIL import Image
+
+from constants import TILE_SIZE, TILE_CACHE_SIZE, ZOOM_SOURCE_CACHE_SIZE, THREAD_POOL_WORKERS
+from image_loader import ImageLoader
+
+# (path, rotation, col, row)
+TileKey = Tuple[str, int, int, int]
+
+_TRANSPOSE = {
+    90: Image.Transpose.ROTATE_270,   # PIL rotates CCW, display rotation is CW
+    180: Image.Transpose.ROTATE_180,
+    270: Image.Transpose.ROTATE_90,
+}
+
+
+def zoom_origin(size: Tuple[int, int], center: Tuple[float, float],
+                view: Tuple[int, int]) -> Tuple[int, int]:
+    """
+    Return the image pixel shown at the view's top-left corner.
+    center is the zoom point as fractions of the image size. The origin is
+    clamped so the view stays inside the image; an image smaller than the
+    view gets a negative origin, which centers it.
+    """
+    origin = []
+    for length, frac, view_len in zip(size, center, view):
+        if length <= view_len:
+            origin.append(-((view_len - length) // 2))
+        else:
+            pos = int(frac * length) - view_len // 2
+            origin.append(max(0, min(pos, length - view_len)))
+    return origin[0], origin[1]
+
+
+class TileCache:
+    def __init__(self, loader: ImageLoader):
+        self._loader = loader
+        self._sources: OrderedDict[Tuple[str, int], Image.Image] = OrderedDict()
+        self._tiles: OrderedDict[TileKey, Image.Image] = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1)
+        self._region_pool = ThreadPoolExecutor(max_workers=THREAD_POOL_WORKERS)
+        self._pending: Optional[Tuple[int, int, Tuple[float, float], Tuple[int, int]]] = None
+
+    def source(self, index: int, rotation: int, preload: bool = True) -> Image.Image:
+        """Full-resolution preview for index, rotated for display."""
+        path = self._loader.paths[index]
+        key = (path, rotation)
+        with self._lock:
+            if key in self._sources:
+                self._sources.move_to_end(key)
+                return self._sources[key]
+        img = self._loader.get(index, preload=preload)
+        if rotation:
+            img = img.transpose(_TRANSPOSE[rotation])
+        with self._lock:
+            self._sources[key] = img
+            self._sources.move_to_end(key)
+            while len(self._sources) > ZOOM_SOURCE_CACHE_SIZE:
+                self._sources.popitem(last=False)
+        return img
+
+    def visible(
+        self, index: int, rotation: int, center: Tuple[float, float],
+        view: Tuple[int, int], preload: bool = True,
+    ) -> List[Tuple[TileKey, int, int, Image.Image]]:
+        """
+        Return (key, x, y, tile) for every tile intersecting the view,
+        where x, y is the tile's top-left corner in view coordinates.
+        """
+        src = self.source(index, rotation, preload=preload)
+        path = self._loader.paths[index]
+        ox, oy = zoom_origin(src.size, center, view)
+        first_col, first_row = max(0, ox) // TILE_SIZE, max(0, oy) // TILE_SIZE
+        last_col = (min(src.width, ox + view[0]) - 1) // TILE_SIZE
+        last_row = (min(src.height, oy + view[1]) - 1) // TILE_SIZE
+
+        result = []
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                key = (path, rotation, col, row)
+                tile = self._tile(key, src)
+                result.append((key, col * TILE_SIZE - ox, row * TILE_SIZE - oy, tile))
+        return result
+
+    def regions(
+        self, requests: List[Tuple[int, int]], center: Tuple[float, float],
+        view: Tuple[int, int],
+    ) -> List[Image.Image]:
+        """
+        Crop the same zoom region from several frames in parallel.
+        Each request is (index, rotation); every crop is at most view in size
+        and uses the same center, so panels stay in sync.
+        """
+        futures = [
+            self._region_pool.submit(self._region, index, rotation, center, view)
+            for index, rotation in requests
+        ]
+        return [f.result() for f in futures]
+
+    def _region(self, index: int, rotation: int, center: Tuple[float, float],
+                view: Tuple[int, int]) -> Image.Image:
+        src = self.source(index, rotation, preload=False)
+        ox, oy = zoom_origin(src.size, center, view)
+        return src.crop((
+            max(0, ox), max(0, oy),
+            min(src.width, ox + view[0]), min(src.height, oy + view[1]),
+        ))
+
+    def prefetch(self, index: int, rotation: int, center: Tuple[float, float],
+                 view: Tuple[int, int]):
+        """Cut the tiles for index's zoom region in the background."""
+        if not 0 <= index < len(self._loader.paths):
+            return
+        with self._lock:
+            schedule = self._pending is None
+            self._pending = (index, rotation, center, view)
+        if schedule:
+            self._pool.submit(self._run_prefetch)
+
+    def _run_prefetch(self):
+        # Only the most recent request matters; older ones are superseded
+        with self._lock:
+            request, self._pending = self._pending, None
+        if request is not None:
+            index, rotation, center, view = request
+            self.visible(index, rotation, center, view, preload=False)
+
+    def _tile(self, key: TileKey, src: Image.Image) -> Image.Image:
+        with self._lock:
+            if key in self._tiles:
+                self._tiles.move_to_end(key)
+                return self._tiles[key]
+        _, _, col, row = key
+        x, y = col * TILE_SIZE, row * TILE_SIZE
+        tile = src.crop((x, y, min(x + TILE_SIZE, src.width), min(y + TILE_SIZE, src.height)))
+        with self._lock:
+            self._tiles[key] = tile
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > TILE_CACHE_SIZE:
+                self._tiles.popitem(last=False)
+        return tile
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+        self._region_pool.shutdown(wait=False)
@@ -0,0 +1,321 @@
+"""XMP sidecars: finding, merging, and a batched background writer.
+
+Keep / delete marks and star ratings are written where Lightroom and
+darktable read them: xmp:Rating (-1 is rejected) and xmp:Label. Existing
+sidecars are parsed and merged, so develop settings and other metadata
+survive. Sidecars this app creates carry a raw-culler marker; that is how
+the scan tells them apart from sidecars of edited files, which remain the
+pre_edited auto-keep signal.
+"""
+
+import io
+import itertools
+import os
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Tuple
+
+from constants import (
+    MARK_KEEP, MARK_DELETE, XMP_SIDECAR_NAMING, XMP_KEEP_LABEL, XMP_DELETE_LABEL,
+    XMP_FLUSH_INTERVAL, XMP_QUIET_INTERVAL, XMP_BATCH_SIZE,
+)
+import metrics
+
+NS_X = "adobe:ns:meta/"
+NS_RDF = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+NS_XMP = "http://ns.adobe.com/xap/1.0/"
+NS_CULLER = "urn:raw-culler:xmp:1.0/"
+
+_PREFIXES = {"x": NS_X, "rdf": NS_RDF, "xmp": NS_XMP, "rawculler": NS_CULLER}
+for _prefix, _uri in _PREFIXES.items():
+    ET.register_namespace(_prefix, _uri)
+
+_CREATED = f"{{{NS_CULLER}}}Created"
+_RATING = f"{{{NS_XMP}}}Rating"
+_LABEL = f"{{{NS_XMP}}}Label"
+_PREVIOUS_LABEL = f"{{{NS_CULLER}}}PreviousLabel"  # label a mark replaced
+_PREVIOUS_RATING = f"{{{NS_CULLER}}}PreviousRating"  # stars a delete replaced
+_CULLER_MARKER = b"rawculler:Created"
+# Present once an editor has touched the sidecar (Lightroom / ACR, darktable)
+_DEVELOP_MARKERS = (b"crs:", b"darktable:history")
+_MAX_SIDECAR_BYTES = 4 * 1024 * 1024
+
+
+def find_sidecar(raw_path: str) -> Optional[str]:
+    """Return the XMP sidecar path if one exists alongside the RAW file, else None."""
+    base = os.path.splitext(raw_path)[0]
+    for candidate in (base + ".xmp", base + ".XMP", raw_path + ".xmp", raw_path + ".XMP"):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def match_sidecar(name: str, lower_names: Dict[str, str]) -> Optional[str]:
+    """Sidecar name for RAW name in a directory listing keyed by lower-cased name."""
+    stem = os.path.splitext(name)[0]
+    for candidate in (stem + ".xmp", name + ".xmp"):
+        match = lower_names.get(candidate.lower())
+        if match:
+            return match
+    return None
+
+
+def new_sidecar_path(raw_path: str) -> str:
+    """Where to create a sidecar: IMG.xmp (Lightroom) or IMG.CR2.xmp (darktable)."""
+    if XMP_SIDECAR_NAMING == "full":
+        return raw_path + ".xmp"
+    return os.path.splitext(raw_path)[0] + ".xmp"
+
+
+def is_culler_sidecar(xmp_path: str) -> bool:
+    """True if this app created the sidecar and no editor has added develop settings."""
+    try:
+        with open(xmp_path, "rb") as f:
+            data = f.read(_MAX_SIDECAR_BYTES)
+    except OSError:
+        return False
+    return _CULLER_MARKER in data and not any(m in data for m in _DEVELOP_MARKERS)
+
+
+def _parse(data: bytes) -> ET.Element:
+    """Parse a sidecar, registering its prefixes so they survive re-serialising."""
+    root = None
+    for event, item in ET.iterparse(io.BytesIO(data), events=("start-ns", "start")):
+        if event == "start-ns":
+            prefix, uri = item
+            if prefix and not re.match(r"ns\d+$", prefix):
+                ET.register_namespace(prefix, uri)
+        elif root is None:
+            root = item
+    return root
+
+
+def _skeleton() -> ET.Element:
+    root = ET.Element(f"{{{NS_X}}}xmpmeta")
+    rdf = ET.SubElement(root, f"{{{NS_RDF}}}RDF")
+    desc = ET.SubElement(rdf, f"{{{NS_RDF}}}Description", {f"{{{NS_RDF}}}about": ""})
+    desc.set(_CREATED, "True")
+    return root
+
+
+def render_sidecar(
+    existing: Optional[bytes], mark: Optional[str], rating: Optional[int] = None,
+) -> bytes:
+    """
+    Sidecar bytes with mark and rating merged into existing (or a new sidecar).
+    delete sets Rating -1 and the delete label; keep sets the keep label;
+    unmarking restores the label a mark replaced. rating None leaves the
+    stored stars alone; the stars a delete replaced are restored once the
+    file is no longer deleted (a rejected -1 with none saved becomes 0).
+    """
+    root = _parse(existing) if existing else _skeleton()
+    descriptions = list(root.iter(f"{{{NS_RDF}}}Description"))
+    if not descriptions:
+        rdf = root.find(f"{{{NS_RDF}}}RDF")
+        if rdf is None:
+            rdf = ET.SubElement(root, f"{{{NS_RDF}}}RDF")
+        descriptions = [ET.SubElement(rdf, f"{{{NS_RDF}}}Description", {f"{{{NS_RDF}}}about": ""})]
+
+    # Current values may be attributes or elements, on any Description; collapse them
+    current_rating = current_label = None
+    previous_label = previous_rating = None
+    for desc in descriptions:
+        previous_label = desc.attrib.pop(_PREVIOUS_LABEL, previous_label)
+        previous_rating = desc.attrib.pop(_PREVIOUS_RATING, previous_rating)
+        for name in (_RATING, _LABEL):
+            value = desc.attrib.pop(name, None)
+            for child in desc.findall(name):
+                value = (child.text or "").strip()
+                desc.remove(child)
+            if value is not None:
+                if name == _RATING:
+                    current_rating = value
+                else:
+                    current_label = value
+
+    ours = (XMP_KEEP_LABEL, XMP_DELETE_LABEL)
+    if current_label and current_label not in ours:
+        previous_label = current_label
+    rejected = current_rating is not None and current_rating.strip().startswith("-")
+    if mark == MARK_DELETE:
+        if rating is not None:
+            previous_rating = str(rating)  # stars set while deleted apply once undeleted
+        elif current_rating is not None and not rejected:
+            previous_rating = current_rating
+        new_rating, new_label = "-1", XMP_DELETE_LABEL
+    else:
+        if rating is not None:
+            new_rating = str(rating)
+        elif rejected:
+            new_rating = previous_rating or "0"  # no longer rejected
+        else:
+            new_rating = current_rating
+        previous_rating = None
+        new_label = XMP_KEEP_LABEL if mark == MARK_KEEP else previous_label
+
+    target = descriptions[0]
+    if new_rating is not None:
+        target.set(_RATING, new_rating)
+    if new_label:
+        target.set(_LABEL, new_label)
+    if previous_label and new_label != previous_label:
+        target.set(_PREVIOUS_LABEL, previous_label)
+    if previous_rating is not None:
+        target.set(_PREVIOUS_RATING, previous_rating)
+    if not existing:
+        ET.indent(root)
+    body = ET.tostring(root, encoding="utf-8", xml_declaration=False)
+    return b'<?xml version="1.0" encoding="UTF-8"?>\n' + body + b"\n"
+
+
+class XmpWriter:
+    """
+    Background sidecar writer. write() only records the latest state per
+    RAW and returns at once; a worker thread lets changes coalesce until
+    none has arrived for XMP_QUIET_INTERVAL (at most XMP_FLUSH_INTERVAL, and
+    not at all once a full batch is queued), writes up to XMP_BATCH_SIZE
+    sidecars to temp files, fsyncs them as a group, then renames them into
+    place.
+    """
+
+    def __init__(
+        self, interval: float = XMP_FLUSH_INTERVAL, batch_size: int = XMP_BATCH_SIZE,
+        quiet: float = XMP_QUIET_INTERVAL,
+    ):
+        self.interval = interval
+        self.quiet = quiet
+        self.batch_size = batch_size
+        self.errors: List[str] = []
+        self.written = 0
+        self._pending: Dict[str, Tuple[Optional[str], Optional[int]]] = {}
+        self._writes = 0  # write() calls so far, to tell when a burst has ended
+        self._cond = threading.Condition()
+        self._busy = False  # a batch is being written
+        self._flush_waiters = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, raw_path: str, mark: Optional[str], rating: Optional[int] = None):
+        """Queue the sidecar state for raw_path, replacing any queued state for it."""
+        with self._cond:
+            queued = self._pending.pop(raw_path, None)
+            if rating is None and queued is not None:
+                rating = queued[1]  # keep a rating change that hasn't been written yet
+            self._pending[raw_path] = (mark, rating)  # re-insert at the end
+            self._writes += 1
+            self._cond.notify()
+
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    @property
+    def idle(self) -> bool:
+        """Nothing queued and no batch being written."""
+        with self._cond:
+            return not self._pending and not self._busy
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued so far is on disk. Returns False on timeout."""
+        with self._cond:
+            self._flush_waiters += 1
+            self._cond.notify_all()
+            try:
+                return self._cond.wait_for(lambda: not self._pending and not self._busy, timeout)
+            finally:
+                self._flush_waiters -= 1
+
+    def close(self):
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return  # closed
+                # Let repeated changes coalesce while they keep coming, unless a full
+                # batch is already queued (a backlog drains without pausing) or
+                # someone is waiting on flush()
+                deadline = time.monotonic() + self.interval
+                while not (self._flush_waiters or self._closed or len(self._pending) >= self.batch_size):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    writes = self._writes
+                    self._cond.wait(min(remaining, self.quiet))
+                    if self._writes == writes and not self._flush_waiters:
+                        break  # quiet: the burst is over
+                batch = {}
+                for path in list(itertools.islice(self._pending, self.batch_size)):
+                    batch[path] = self._pending.pop(path)
+                self._busy = True
+            try:
+                self._write_batch(batch)
+            except Exception as e:  # keep the thread alive so flush() and close() return
+                self.errors.append(f"batch of {len(batch)}: {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _write_batch(self, batch: Dict[str, Tuple[Optional[str], Optional[int]]]):
+        staged = []  # (open temp file, temp path, final path)
+        with metrics.timer("xmp_batch_seconds"):
+            for raw_path, (mark, rating) in batch.items():
+                tmp = None
+                try:
+                    path = find_sidecar(raw_path)
+                    existing = None
+                    if path is not None:
+                        with open(path, "rb") as f:
+                            existing = f.read()
+                    elif mark is None and rating is None:
+                        continue  # nothing to record, don't create a sidecar for it
+                    else:
+                        path = new_sidecar_path(raw_path)
+                    data = render_sidecar(existing, mark, rating)
+                    tmp = path + ".tmp"
+                    f = open(tmp, "wb")
+                    f.write(data)
+                    staged.append((f, tmp, path))
+                except Exception as e:  # one bad sidecar must not kill the writer thread
+                    self.errors.append(f"{os.path.basename(raw_path)}: {e}")
+                    if tmp and os.path.exists(tmp):
+                        os.unlink(tmp)
+
+            # Group commit: one fsync pass over the whole batch, then the renames
+            directories = set()
+            written = 0
+            for f, tmp, path in staged:
+                try:
+                    f.flush()
+                    os.fsync(f.fileno())
+                    f.close()
+                    os.replace(tmp, path)
+                    directories.add(os.path.dirname(path))
+                    written += 1
+                except Exception as e:
+                    f.close()
+                    self.errors.append(f"{os.path.basename(path)}: {e}")
+            for directory in directories:
+                try:
+                    fd = os.open(directory, os.O_RDONLY)
+                except OSError:
+                    continue  # e.g. directories can't be opened on Windows
+                try:
+                    os.fsync(fd)
+                except OSError:
+                    pass
+                finally:
+                    os.close(fd)
+        self.written += written
+        metrics.inc("xmp_sidecars_written_total", written)